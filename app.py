@@ -1,11 +1,17 @@
 # app.py
 
-from flask import Flask, render_template, request, flash, jsonify
-from utils.etf_utils import get_etf_insights, get_etf_insights_from_keywords
-from utils.bond_utils import get_bond_opportunities, analyze_mezzanine_bonds, get_potential_issuers, get_similar_mezzanine_bonds, get_market_overview
+from flask import Flask, render_template, request, flash, jsonify, Response, stream_with_context
+from utils.etf_utils import get_parse_stats, get_etf_insights_for_urls, get_etf_insights_from_keywords, stream_etf_insights_for_urls, stream_etf_insights_from_keywords
+from utils.openai_utils import get_completion_cache_stats, get_query_embedding_stats
+from utils.job_queue import job_queue
+from utils.lazy_utils import WARMUP_ON_START, readiness, start_warm_up
+from utils.bond_utils import get_bond_opportunities, analyze_mezzanine_bonds, get_potential_issuers, get_similar_mezzanine_bonds, get_market_overview, parse_similarity_queries, iter_similar_mezzanine_bonds, get_maturity_calendar, parse_num_similar, get_latest_quarter_columns
 import os
 from dotenv import load_dotenv
 import pandas as pd
+import json
+import io
+import csv
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +22,13 @@ app.secret_key = os.getenv("SECRET_KEY")
 if not app.secret_key:
     raise ValueError("SECRET_KEY is not set in environment variables.")
 
+# 모델, 코퍼스, 채권 데이터는 요청을 막지 않도록 백그라운드에서 미리 로드
+if WARMUP_ON_START:
+    start_warm_up()
+
+# 재시작 전에 대기 중이던 백그라운드 작업 재개
+job_queue.start()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -37,8 +50,7 @@ def insight_etf_url():
         return render_template('insight_etf.html', etfs=None)
     
     all_etfs = []
-    for url in urls:
-        insights = get_etf_insights(url)
+    for url, insights in get_etf_insights_for_urls(urls):
         if isinstance(insights, str):
             all_etfs.append({'message': insights, 'url': url})
         elif isinstance(insights, list):
@@ -74,17 +86,80 @@ def insight_etf_keywords():
     
     return render_template('insight_etf.html', etfs=insights)
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/insight_etf_stream', methods=['GET'])
+def insight_etf_stream():
+    # ETF 추천을 생성되는 대로 Server-Sent Events로 전송
+    urls = [url.strip() for url in request.args.get('article_urls', '').split(',') if url.strip()]
+    keywords_list = [keyword.strip() for keyword in request.args.get('keywords', '').split(',') if keyword.strip()]
+
+    def generate():
+        if urls:
+            # URL들을 동시에 분석하고 결과가 나오는 대로 URL을 붙여 전송
+            for url, kind, payload in stream_etf_insights_for_urls(urls):
+                if kind == 'etf':
+                    payload['url'] = url
+                    yield sse_event('etf', payload)
+                else:
+                    yield sse_event('message', {'message': payload, 'url': url})
+        elif keywords_list:
+            for kind, payload in stream_etf_insights_from_keywords(keywords_list):
+                if kind == 'etf':
+                    yield sse_event('etf', payload)
+                else:
+                    yield sse_event('message', {'message': payload})
+        else:
+            yield sse_event('message', {'message': "Please enter at least one URL or keyword."})
+        yield sse_event('done', {})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _split_values(value):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+@app.route('/jobs/etf_insights', methods=['POST'])
+def submit_etf_insights_job():
+    # 분석을 백그라운드 작업으로 등록하고 작업 ID를 즉시 반환
+    params = request.get_json(silent=True) or request.form
+    urls = _split_values(params.get('article_urls'))
+    keywords_list = _split_values(params.get('keywords'))
+    if not urls and not keywords_list:
+        return jsonify({'error': "Please enter at least one URL or keyword."}), 400
+
+    job_id = job_queue.submit('etf_insights', urls=urls or None, keywords=None if urls else keywords_list)
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f"/jobs/{job_id}"}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    # wait=초 를 주면 작업이 끝날 때까지(최대 60초) 응답을 보류
+    try:
+        timeout = min(float(request.args.get('wait', 0)), 60.0)
+    except ValueError:
+        return jsonify({'error': "wait must be a number of seconds"}), 400
+    job = job_queue.wait(job_id, timeout) if timeout > 0 else job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
 @app.route('/bond_tracker', methods=['GET', 'POST'])
 def bond_tracker():
     market_overview = get_market_overview()
     similar_bonds = []  # 기본값으로 빈 리스트 설정
-    potential_issuers = get_potential_issuers(min_market_cap=0, max_debt_ratio=float('inf'), min_shareholder_ratio=0)
+    potential_issuers = get_potential_issuers(min_market_cap=0, max_debt_ratio=float('inf'), min_shareholder_ratio=0, months_to_maturity=None)
 
     if request.method == 'POST':
         if 'bond_form' in request.form:
-            amount = float(request.form['amount'])
-            interest_rate = float(request.form['interest_rate'])
-            similar_bonds = get_similar_mezzanine_bonds(amount, interest_rate)
+            try:
+                amount = float(request.form['amount'])
+                interest_rate = float(request.form['interest_rate'])
+                similar_bonds = get_similar_mezzanine_bonds(amount, interest_rate)
+            except ValueError as e:
+                flash(str(e), "error")
             print("SIMILAR BONDS: ", similar_bonds)
         elif 'issuer_form' in request.form:
             min_market_cap = float(request.form.get('min_market_cap', 0))
@@ -93,6 +168,8 @@ def bond_tracker():
             months_to_maturity = int(request.form.get('months_to_maturity', 9))
             potential_issuers = get_potential_issuers(min_market_cap, max_debt_ratio, min_shareholder_ratio, months_to_maturity)
 
+    sales_column, profit_column = get_latest_quarter_columns() if potential_issuers else (None, None)
+
     if similar_bonds:
         max_amount = max(bond['총발행금액 (₩)'] for bond in similar_bonds)
     else:
@@ -106,17 +183,22 @@ def bond_tracker():
     return render_template('bond_tracker.html', 
                            similar_bonds=similar_bonds, 
                            potential_issuers=potential_issuers,
+                           sales_column=sales_column,
+                           profit_column=profit_column,
                            market_overview=market_overview,
                            max_amount=max_amount,
                            debug_info=debug_info)
 
 @app.route('/get_chart_data', methods=['POST'])
 def get_chart_data():
-    amount = float(request.form['amount'])
-    interest_rate = float(request.form['interest_rate'])
-    similar_bonds = get_similar_mezzanine_bonds(amount, interest_rate)
+    try:
+        amount = float(request.form['amount'])
+        interest_rate = float(request.form['interest_rate'])
+        similar_bonds = get_similar_mezzanine_bonds(amount, interest_rate)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    labels = [bond['발행대상 회사'] for bond in similar_bonds]
+    labels = [bond['종목명'] for bond in similar_bonds]
     amounts = [bond['총발행금액 (₩)'] for bond in similar_bonds]
     interest_rates = [bond['표면이자율 (%)'] for bond in similar_bonds]
     
@@ -126,5 +208,82 @@ def get_chart_data():
         'interest_rates': interest_rates
     })
 
+def _json_default(value):
+    # Timestamp, numpy 스칼라 등 JSON 기본 타입이 아닌 값 변환
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+@app.route('/similar_bonds/batch', methods=['POST'])
+def similar_bonds_batch():
+    # JSON ({"queries": [...], "num_similar": 5}) 또는 CSV 파일 업로드로 여러 조건을 한 번에 조회
+    try:
+        if 'file' in request.files:
+            upload = io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig')
+            rows = list(csv.DictReader(upload))
+            num_similar = parse_num_similar(request.form.get('num_similar', 5))
+        else:
+            payload = request.get_json(silent=True)
+            if isinstance(payload, dict):
+                rows = payload.get('queries')
+                num_similar = parse_num_similar(payload.get('num_similar', 5))
+            else:
+                rows, num_similar = payload, 5
+        queries = parse_similarity_queries(rows)
+    except (ValueError, TypeError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        for index, (query, similar_bonds) in enumerate(iter_similar_mezzanine_bonds(queries, num_similar)):
+            line = {'index': index, 'query': query, 'similar_bonds': similar_bonds}
+            yield json.dumps(line, ensure_ascii=False, default=_json_default) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/mezzanine/analytics', methods=['GET'])
+def mezzanine_analytics():
+    try:
+        analysis = analyze_mezzanine_bonds(request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(json.dumps(analysis, ensure_ascii=False, default=_json_default), mimetype='application/json')
+
+@app.route('/maturity_calendar', methods=['GET'])
+def maturity_calendar():
+    # 차트용 만기/풋/콜 도래 캘린더, months를 주면 해당 기간 내 도래 발행사 포함
+    try:
+        calendar = get_maturity_calendar(
+            event=request.args.get('event', 'maturity'),
+            freq=request.args.get('freq', 'month'),
+            months=request.args.get('months', type=int),
+            as_of=request.args.get('as_of'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(calendar)
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    status = readiness()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/stats/llm_cache', methods=['GET'])
+def llm_cache_stats():
+    return jsonify(get_completion_cache_stats())
+
+@app.route('/stats/etf_parsing', methods=['GET'])
+def etf_parsing_stats():
+    return jsonify(get_parse_stats())
+
+@app.route('/stats/query_embeddings', methods=['GET'])
+def query_embedding_stats():
+    return jsonify(get_query_embedding_stats())
+
+@app.route('/stats/market', methods=['GET'])
+def market_stats():
+    return jsonify(get_market_overview())
+
 if __name__ == '__main__':
     app.run(debug=True)
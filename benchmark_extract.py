@@ -0,0 +1,47 @@
+# benchmark_extract.py
+#
+# Compares article extraction engines on saved HTML pages.
+# Usage: python benchmark_extract.py [fixture.html ...] (defaults to data/fixtures/*.html)
+
+import sys
+import glob
+import timeit
+from bs4 import BeautifulSoup
+from utils.extract_utils import DEFAULT_RULE, etree, extract_with_lxml, extract_with_stream
+
+
+def extract_with_bs4(content, rule=DEFAULT_RULE):
+    """
+    Previous implementation: full BeautifulSoup tree of the page.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    article = soup.find(rule.tag, rule.attrs)
+    if not article:
+        return None
+    for tag in article(list(rule.strip_tags)):
+        tag.decompose()
+    return article.get_text('\n', strip=True)
+
+
+ENGINES = [('bs4 (html.parser)', extract_with_bs4), ('stream', extract_with_stream)]
+if etree is not None:
+    ENGINES.append(('lxml', extract_with_lxml))
+
+
+def run(paths, repeat=20):
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        print(f"{path} ({len(content) / 1024:.0f} KB)")
+
+        baseline = extract_with_bs4(content)
+        baseline_ms = None
+        for name, extract in ENGINES:
+            seconds = min(timeit.repeat(lambda: extract(content), number=1, repeat=repeat))
+            baseline_ms = baseline_ms or seconds * 1000
+            same = "same text" if extract(content) == baseline else "TEXT DIFFERS"
+            print(f"  {name:<20} {seconds * 1000:8.2f} ms  {baseline_ms / (seconds * 1000):5.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    run(sys.argv[1:] or sorted(glob.glob('data/fixtures/*.html')))
@@ -0,0 +1,52 @@
+# benchmark_startup.py
+#
+# Measures cold-start cost: importing app.py and the first request to each page,
+# each in a fresh interpreter with the background warm-up disabled.
+# Usage: python benchmark_startup.py [runs]  (exits with 1 when a budget is exceeded)
+
+import os
+import sys
+import json
+import subprocess
+
+# Budgets in milliseconds; override with STARTUP_BUDGET_<NAME>_MS
+BUDGETS_MS = {
+    'import app': float(os.getenv("STARTUP_BUDGET_IMPORT_MS", 2000)),
+    'GET /': float(os.getenv("STARTUP_BUDGET_INDEX_MS", 50)),
+    'GET /bond_tracker': float(os.getenv("STARTUP_BUDGET_BOND_TRACKER_MS", 500)),
+}
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+timings = {'import app': time.perf_counter() - start}
+client = app.app.test_client()
+for path in ('/', '/bond_tracker'):
+    start = time.perf_counter()
+    status = client.get(path).status_code
+    assert status == 200, (path, status)
+    timings['GET ' + path] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def measure():
+    env = dict(os.environ, WARMUP_ON_START='0', BOND_DATA_WATCH_INTERVAL='0')
+    output = subprocess.run([sys.executable, '-c', _PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run(runs=3):
+    results = [measure() for _ in range(runs)]
+    over_budget = False
+    for name, budget in BUDGETS_MS.items():
+        best = min(result[name] for result in results) * 1000
+        status = "ok" if best <= budget else "OVER BUDGET"
+        over_budget |= best > budget
+        print(f"{name:<20} {best:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+    return over_budget
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run(int(sys.argv[1]) if len(sys.argv) > 1 else 3) else 0)
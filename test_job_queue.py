@@ -0,0 +1,60 @@
+import os
+import time
+import sqlite3
+import tempfile
+import utils.job_queue as job_queue_module
+from utils.job_queue import JobQueue
+
+
+def _insert_job(db_path, job_id, status, updated_at):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, params, status, created_at, updated_at) VALUES (?, 'echo', ?, ?, ?, ?)",
+            (job_id, '{"value": 1}', status, updated_at, updated_at)
+        )
+    conn.close()
+
+
+def test_job_of_crashed_worker_is_requeued():
+    # 크래시 직후(하트비트 만료 전)에 재시작해도 이후 스윕에서 작업이 재개되어야 함
+    job_queue_module.JOB_HEARTBEAT_SECONDS = 0.1
+    job_queue_module.JOB_STALE_SECONDS = 0.5
+    db_path = os.path.join(tempfile.mkdtemp(), 'jobs.sqlite')
+
+    crashed = JobQueue(db_path)
+    with crashed._connect():
+        pass
+    _insert_job(db_path, 'crashed-job', 'running', time.time())
+
+    restarted = JobQueue(db_path)
+    restarted.register('echo', lambda value: value + 1)
+    restarted.start()
+    assert restarted.get('crashed-job')['status'] == 'running'
+
+    job = restarted.wait('crashed-job', timeout=5)
+    assert job['status'] == 'done'
+    assert job['result'] == 2
+
+
+def test_live_job_is_not_requeued():
+    job_queue_module.JOB_HEARTBEAT_SECONDS = 0.1
+    job_queue_module.JOB_STALE_SECONDS = 0.5
+    db_path = os.path.join(tempfile.mkdtemp(), 'jobs.sqlite')
+    runs = []
+
+    def slow(value):
+        runs.append(value)
+        time.sleep(1.5)
+        return value
+
+    queue = JobQueue(db_path)
+    queue.register('slow', slow)
+    job_id = queue.submit('slow', value=1)
+    assert queue.wait(job_id, timeout=5)['status'] == 'done'
+    assert runs == [1]
+
+
+if __name__ == '__main__':
+    test_job_of_crashed_worker_is_requeued()
+    test_live_job_is_not_requeued()
+    print("ok")
@@ -0,0 +1,36 @@
+from utils.json_stream import JSONObjectStream
+
+
+def _parse(pieces):
+    parser = JSONObjectStream()
+    objects = []
+    for piece in pieces:
+        objects.extend(parser.feed(piece))
+    objects.extend(parser.close())
+    return parser, objects
+
+
+def test_truncated_middle_object_does_not_swallow_the_rest():
+    text = '[{"ticker": "AAA"}, {"ticker": "BBB", "top5": [1, 2, {"ticker": "CCC"}, {"ticker": "DDD"}]'
+    parser, objects = _parse([text[i:i + 7] for i in range(0, len(text), 7)])
+    assert objects == [{'ticker': 'AAA'}, {'ticker': 'CCC'}, {'ticker': 'DDD'}]
+    assert len(parser.errors) == 1
+
+
+def test_malformed_object_is_rescanned():
+    parser, objects = _parse(['{"ticker": "AAA", "bad": {"ticker": "BBB"} oops} {"ticker": "CCC"}'])
+    assert objects == [{'ticker': 'BBB'}, {'ticker': 'CCC'}]
+    assert len(parser.errors) == 1
+
+
+def test_well_formed_stream():
+    parser, objects = _parse(['{"a": "}{"}', ' {"b": {"c": 1}}'])
+    assert objects == [{'a': '}{'}, {'b': {'c': 1}}]
+    assert parser.errors == []
+
+
+if __name__ == '__main__':
+    test_truncated_middle_object_does_not_swallow_the_rest()
+    test_malformed_object_is_rescanned()
+    test_well_formed_stream()
+    print("ok")
@@ -0,0 +1,370 @@
+# utils/bond_data.py
+
+import os
+import time
+import hashlib
+import logging
+import threading
+import itertools
+import numpy as np
+import pandas as pd
+from utils.ingest_utils import read_table
+from utils.lazy_utils import LazyResource
+from utils.bond_similarity import SimilarBondEngine
+from utils.market_stats import MarketStatistics
+from utils.mezzanine_analytics import MezzanineAnalytics
+from utils.maturity_calendar import MaturityCalendar
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BONDS_PATH = 'data/issue_decision_regular_report.csv'
+QUARTERLY_PATH = 'data/business_quarterly_report.csv'
+MARKET_PATH = 'data/market_info.csv'
+BOND_LIST_PATH = 'data/bond_data.csv'
+
+# Seconds between checks of the data files for changes; 0 disables the watcher
+BOND_DATA_WATCH_INTERVAL = float(os.getenv("BOND_DATA_WATCH_INTERVAL", 60))
+
+# Columns of the issuer table with a sorted index for range lookups
+ISSUER_INDEX_COLUMNS = ['시가총액 (₩)', '부채비율', '대주주 지분율(%)']
+# Filtered through the bond-level maturity index, so bonds already repaid can be excluded
+MATURITY_COLUMN = '기발행사채만기일'
+
+
+def load_bonds(filepath=BONDS_PATH, columns=None):
+    """
+    Loads the mezzanine bond issue decisions.
+    '종목명' is cut to its first word so bonds join with market data.
+    """
+    df = read_table(filepath, columns)
+    if '종목명' not in df.columns:
+        return df
+    return df.assign(종목명=df['종목명'].str.split().str[0].astype('category'))
+
+
+def load_quarterly(filepath=QUARTERLY_PATH, columns=None):
+    """
+    Loads the quarterly business reports.
+    """
+    return read_table(filepath, columns)
+
+
+def load_market(filepath=MARKET_PATH, columns=None):
+    """
+    Loads the market information of listed companies.
+    """
+    return read_table(filepath, columns)
+
+
+def load_bond_list(filepath=BOND_LIST_PATH, columns=None):
+    """
+    Loads the listed bonds by industry.
+    """
+    return read_table(filepath, columns)
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class IssuerUniverse:
+    """
+    Issuer table (market data + latest quarterly results) built once, ordered by
+    market cap, with a sorted index per filter column. Bond maturities are indexed
+    per bond rather than per issuer, so a maturity range with a lower bound of today
+    only matches issuers with a bond still outstanding.
+    """
+
+    def __init__(self, df_market, df_quarterly, df_bonds):
+        combined = pd.merge(df_market, df_quarterly, on='종목명', how='inner')
+
+        # 발행사별 가장 빠른 기발행사채만기일
+        maturities = pd.to_datetime(df_bonds['기발행사채만기일'], errors='coerce', format='%Y-%m-%d')
+        combined['기발행사채만기일'] = combined['종목명'].map(maturities.groupby(df_bonds['종목명']).min())
+
+        # 최신 분기 데이터 선택
+        self.latest_quarter = combined.filter(regex=r'\d분기 매출액').columns[-1]
+        self.latest_profit = self.latest_quarter.replace('매출액', '영업이익')
+
+        self.table = combined.sort_values('시가총액 (₩)', ascending=False, kind='stable').reset_index(drop=True)
+        self.indexes = {column: self._build_index(self.table[column]) for column in ISSUER_INDEX_COLUMNS}
+        self.bond_maturities = self._bond_maturity_index(df_bonds, maturities)
+
+        result_columns = ['종목명', '주가 (₩)', '시가총액 (₩)', self.latest_quarter, self.latest_profit,
+                          '부채비율', '대주주 지분율(%)', '기발행사채만기일']
+        results = self.table[result_columns].copy()
+        results['기발행사채만기일'] = results['기발행사채만기일'].dt.strftime('%Y-%m-%d')
+        self.records = tuple(results.to_dict('records'))
+
+        logger.info(f"Issuer universe built with {len(self.table)} companies")
+
+    @staticmethod
+    def _to_numeric(values):
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return np.where(values.isna(), np.nan, values.to_numpy('datetime64[ns]').astype('int64')).astype(float)
+        return values.to_numpy(dtype=float, na_value=np.nan)
+
+    @classmethod
+    def _build_index(cls, values):
+        numeric = cls._to_numeric(values)
+        valid = np.flatnonzero(~np.isnan(numeric))
+        order = valid[np.argsort(numeric[valid], kind='stable')]
+        return _read_only(numeric[order]), _read_only(order)
+
+    def _bond_maturity_index(self, df_bonds, maturities):
+        row_of_issuer = pd.Series(np.arange(len(self.table)), index=self.table['종목명'].astype(object))
+        row_of_issuer = row_of_issuer[~row_of_issuer.index.duplicated()]
+        rows = df_bonds['종목명'].astype(object).map(row_of_issuer).to_numpy(dtype=float, na_value=np.nan)
+        values = self._to_numeric(maturities)
+        valid = ~np.isnan(rows) & ~np.isnan(values)
+        order = np.argsort(values[valid], kind='stable')
+        return _read_only(values[valid][order]), _read_only(rows[valid][order].astype(np.intp))
+
+    def maturity_rows(self, lower=-np.inf, upper=np.inf):
+        """
+        Returns (rows, maturities): the table rows of the issuers with a bond maturing
+        in [lower, upper] (ns timestamps) and the earliest such maturity of each.
+        """
+        values, rows = self.bond_maturities
+        start = np.searchsorted(values, lower, side='left')
+        end = np.searchsorted(values, upper, side='right')
+        # 만기일 순으로 정렬되어 있으므로 발행사별 첫 번째가 가장 빠른 만기
+        issuer_rows, first = np.unique(rows[start:end], return_index=True)
+        return issuer_rows, values[start:end][first]
+
+    def range_rows(self, column, lower=-np.inf, upper=np.inf):
+        """Returns the table rows whose column value lies in [lower, upper]."""
+        if column == MATURITY_COLUMN:
+            return self.maturity_rows(lower, upper)[0]
+        sorted_values, order = self.indexes[column]
+        start = np.searchsorted(sorted_values, lower, side='left')
+        end = np.searchsorted(sorted_values, upper, side='right')
+        return order[start:end]
+
+    def query(self, ranges, max_results, maturities_from=None):
+        """
+        Returns the records matching every (column, lower, upper) range, largest market cap first.
+        With maturities_from (ns timestamp), 기발행사채만기일 is the issuer's earliest bond
+        maturity from then on instead of the earliest of all its bonds.
+        Records are copies, so callers may modify them.
+        """
+        hits = np.zeros(len(self.table), dtype=np.int32)
+        for column, lower, upper in ranges:
+            hits[self.range_rows(column, lower, upper)] += 1
+        rows = np.flatnonzero(hits == len(ranges))[:max_results]
+        records = [dict(self.records[row]) for row in rows]
+        if maturities_from is not None:
+            issuer_rows, maturities = self.maturity_rows(maturities_from)
+            nearest = dict(zip(issuer_rows.tolist(), maturities.tolist()))
+            for row, record in zip(rows.tolist(), records):
+                maturity = nearest.get(row)
+                record[MATURITY_COLUMN] = pd.Timestamp(int(maturity)).strftime('%Y-%m-%d') if maturity is not None else None
+        return records
+
+
+# Snapshot attribute -> (file, loader)
+DATASETS = {
+    'df_bonds': (BONDS_PATH, load_bonds),
+    'df_quarterly': (QUARTERLY_PATH, load_quarterly),
+    'df_market': (MARKET_PATH, load_market),
+    'df_bond_list': (BOND_LIST_PATH, load_bond_list),
+}
+
+# Snapshot attribute -> (builder, datasets it is built from)
+# An index with an updated(*datasets) method is derived from the previous version
+# instead of being rebuilt when its datasets change.
+DERIVED_INDEXES = {
+    'issuer_universe': (IssuerUniverse, ('df_market', 'df_quarterly', 'df_bonds')),
+    'similar_bonds': (SimilarBondEngine, ('df_bonds', 'df_market')),
+    'market_stats': (MarketStatistics, ('df_market', 'df_quarterly')),
+    'mezzanine': (MezzanineAnalytics, ('df_bonds',)),
+    'maturity_calendar': (MaturityCalendar, ('df_bonds',)),
+}
+
+
+class BondSnapshot:
+    """
+    One consistent version of the bond reference data and the indexes derived from it.
+    A snapshot is never modified after it is built: request handlers read it without
+    locks, and a refresh builds a new snapshot and publishes it in a single swap.
+    Callers must treat the frames as read-only and derive new frames (assign, merge,
+    copy) instead of writing into them.
+    """
+
+    def __init__(self, version, derived=None, previous=None, **frames):
+        self.version = version
+        for name in DATASETS:
+            setattr(self, name, frames[name])
+        for name, (build, inputs) in DERIVED_INDEXES.items():
+            index = (derived or {}).get(name)
+            if index is None:
+                sources = [frames[source] for source in inputs]
+                prior = (previous or {}).get(name)
+                index = prior.updated(*sources) if hasattr(prior, 'updated') else build(*sources)
+            setattr(self, name, index)
+
+    def replace(self, version, **frames):
+        """
+        Returns a new snapshot with some of the frames replaced.
+        Derived indexes are rebuilt or updated only when one of their source frames changed.
+        """
+        merged = {name: frames.get(name, getattr(self, name)) for name in DATASETS}
+        derived, previous = {}, {}
+        for name, (_, inputs) in DERIVED_INDEXES.items():
+            if any(source in frames for source in inputs):
+                previous[name] = getattr(self, name)
+            else:
+                derived[name] = getattr(self, name)
+        return BondSnapshot(version, derived, previous, **merged)
+
+
+_snapshot = None
+_publish_lock = threading.Lock()
+_versions = itertools.count(1)
+
+
+def next_version():
+    """Returns a new, increasing snapshot version number."""
+    return next(_versions)
+
+
+def publish_snapshot(snapshot):
+    """
+    Makes the snapshot the one returned by get_snapshot.
+    Readers holding the previous snapshot keep using it until they finish.
+    """
+    global _snapshot
+    with _publish_lock:
+        _snapshot = snapshot
+    logger.info(f"Published bond data snapshot v{snapshot.version}")
+    return snapshot
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DataSourceManager:
+    """
+    Keeps the published snapshot in step with the data files.
+    Each file is checked by mtime and size, and a changed stat is confirmed with a
+    content hash, so touching a file without changing it does not reload anything.
+    Only the datasets that changed are reloaded; the others are carried over from
+    the current snapshot. A file that fails to load keeps its previous version.
+    """
+
+    def __init__(self, datasets=DATASETS, interval=BOND_DATA_WATCH_INTERVAL):
+        self.datasets = datasets
+        self.interval = interval
+        self._signatures = {}
+        self._refresh_lock = threading.Lock()
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+
+    def _signature(self, path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _changed(self, name):
+        """Returns the new (stat, hash) signature of a changed dataset, or None."""
+        path = self.datasets[name][0]
+        stat = self._signature(path)
+        previous = self._signatures.get(name)
+        if previous and previous[0] == stat:
+            return None
+        content_hash = _file_hash(path)
+        if previous and previous[1] == content_hash:
+            self._signatures[name] = (stat, content_hash)
+            return None
+        return stat, content_hash
+
+    def load(self):
+        """
+        Loads every dataset and publishes the first snapshot.
+        Returns the current snapshot when one was already published.
+        """
+        with self._refresh_lock:
+            if _snapshot is not None:
+                return _snapshot
+            frames = {}
+            for name, (path, loader) in self.datasets.items():
+                signature = (self._signature(path), _file_hash(path))
+                frames[name] = loader(path)
+                self._signatures[name] = signature
+            return publish_snapshot(BondSnapshot(version=next_version(), **frames))
+
+    def refresh(self):
+        """
+        Reloads the datasets whose files changed and publishes a new snapshot.
+        Returns the names of the reloaded datasets.
+        """
+        if _snapshot is None:
+            self.load()
+            return list(self.datasets)
+
+        with self._refresh_lock:
+            frames, signatures = {}, {}
+            for name, (path, loader) in self.datasets.items():
+                try:
+                    signature = self._changed(name)
+                    if signature is None:
+                        continue
+                    frames[name] = loader(path)
+                    signatures[name] = signature
+                except Exception as e:
+                    # 파일이 쓰는 중이거나 잘못된 경우 이전 버전 유지
+                    logger.error(f"Error reloading {path}, keeping the loaded version: {e}")
+
+            if frames:
+                try:
+                    publish_snapshot(_snapshot.replace(next_version(), **frames))
+                except Exception as e:
+                    logger.error(f"Error rebuilding bond data indexes, keeping the current snapshot: {e}")
+                    return []
+                self._signatures.update(signatures)
+                logger.info(f"Reloaded bond datasets: {', '.join(frames)}")
+            return list(frames)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error checking bond data files: {e}")
+
+    def start(self):
+        """
+        Starts the background watcher thread once per process.
+        """
+        with self._watcher_lock:
+            # fork 이후에는 자식 프로세스에서 감시 스레드를 새로 시작
+            if self.interval <= 0 or self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name='bond-data-watcher', daemon=True).start()
+
+
+data_sources = DataSourceManager()
+
+# The first snapshot, loaded on first use or first by the warm-up thread (it is small)
+bond_data = LazyResource('bond_data', lambda: data_sources.load().version, priority=10)
+
+
+def get_snapshot():
+    """
+    Returns the current bond data snapshot, loading it and starting the file watcher
+    on first use. Take the snapshot once per request and read everything from it, so
+    a refresh in the middle of a request cannot mix two versions.
+    """
+    if _snapshot is None:
+        bond_data.get()
+    data_sources.start()
+    return _snapshot
@@ -0,0 +1,158 @@
+# utils/bond_similarity.py
+
+import os
+import json
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bond terms compared by the similarity search
+SIMILARITY_FEATURES = ['총발행금액 (₩)', '표면이자율 (%)', '만기이자율 (%)', '리픽싱비율 (%)', '콜가능비율 (%)']
+
+# 발행금액은 규모 차이가 크므로 로그 스케일로 비교
+LOG_SCALED_FEATURES = {'총발행금액 (₩)'}
+
+# Relative importance of each feature, e.g. SIMILAR_BOND_WEIGHTS='{"리픽싱비율 (%)": 2}'
+DEFAULT_SIMILARITY_WEIGHTS = {
+    '총발행금액 (₩)': 1.0,
+    '표면이자율 (%)': 1.0,
+    '만기이자율 (%)': 0.5,
+    '리픽싱비율 (%)': 0.5,
+    '콜가능비율 (%)': 0.5,
+}
+DEFAULT_SIMILARITY_WEIGHTS.update(json.loads(os.getenv("SIMILAR_BOND_WEIGHTS", "{}")))
+
+
+class SimilarBondEngine:
+    """
+    Nearest-neighbour search over bond terms.
+    The features are standardized once into a matrix (missing values count as the
+    column mean), and each query scores every bond with a weighted squared distance
+    over the features it specifies and keeps the top k with argpartition.
+    Result records, joined with the issuer's market cap, are also built once.
+    """
+
+    def __init__(self, df_bonds, df_market, features=SIMILARITY_FEATURES):
+        self.features = list(features)
+        raw = np.column_stack([self._scale(column, df_bonds[column].to_numpy(dtype=float, na_value=np.nan))
+                               for column in self.features])
+        self.center = np.nanmean(raw, axis=0)
+        scale = np.nanstd(raw, axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0)
+
+        matrix = np.nan_to_num((raw - self.center) / self.scale, nan=0.0)
+        matrix.flags.writeable = False
+        self.matrix = matrix
+        squared = matrix * matrix
+        squared.flags.writeable = False
+        self.squared = squared
+
+        # 시가총액 정보 추가
+        market_caps = df_market.drop_duplicates('종목명').set_index('종목명')['시가총액 (₩)']
+        records = df_bonds.reset_index(drop=True)
+        market_cap = records['종목명'].astype(object).map(market_caps)
+        records['시가총액 (₩)'] = market_cap.astype(object).where(market_cap.notna(), None).to_numpy()
+        self.records = tuple(records.to_dict('records'))
+
+        logger.info(f"Similar bond engine built with {len(self.records)} bonds")
+
+    @staticmethod
+    def _scale(column, values):
+        if column in LOG_SCALED_FEATURES:
+            return np.log10(np.where(values > 0, values, np.nan))
+        return values
+
+    def transform(self, query):
+        """
+        Returns the standardized query vector and the indexes of the features it specifies.
+        query maps feature columns to values; None values are ignored.
+        """
+        vector = np.zeros(len(self.features))
+        active = []
+        for i, column in enumerate(self.features):
+            value = query.get(column)
+            if value is None:
+                continue
+            value = self._scale(column, np.float64(value))
+            if np.isnan(value):
+                continue
+            vector[i] = (value - self.center[i]) / self.scale[i]
+            active.append(i)
+        return vector, active
+
+    def _weights(self, weights):
+        weights = {**DEFAULT_SIMILARITY_WEIGHTS, **(weights or {})}
+        return np.array([weights.get(column, 0.0) for column in self.features])
+
+    def search(self, query, k=5, weights=None):
+        """
+        Returns (rows, distances) of the k bonds closest to the query, closest first.
+        """
+        vector, active = self.transform(query)
+        if not active or not len(self.records) or k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        diff = self.matrix[:, active] - vector[active]
+        distances = (diff * diff) @ self._weights(weights)[active]
+
+        k = min(k, len(distances))
+        rows = np.argpartition(distances, k - 1)[:k]
+        rows = rows[np.argsort(distances[rows], kind='stable')]
+        return rows, distances[rows]
+
+    def similar(self, query, k=5, weights=None):
+        """
+        Returns the records of the k closest bonds with their similarity_score
+        (weighted distance, lower is more similar). Records are copies.
+        """
+        rows, distances = self.search(query, k, weights)
+        return [dict(self.records[row], similarity_score=float(distance)) for row, distance in zip(rows, distances)]
+
+    def search_batch(self, queries, k=5, weights=None):
+        """
+        Returns (rows, distances) arrays of shape (len(queries), k) for many queries in
+        one pass. The weighted distance is expanded as sum(w*m^2) - 2*sum(w*q*m) +
+        sum(w*q^2), so every query is scored against every bond with two matrix
+        products. Queries may specify different features; a query that specifies none
+        gets rows of -1 and infinite distances.
+        """
+        n_queries, n_bonds = len(queries), len(self.records)
+        k = max(min(k, n_bonds), 0)
+        if not n_queries or not k:
+            return np.empty((n_queries, 0), dtype=np.intp), np.empty((n_queries, 0))
+
+        vectors = np.zeros((n_queries, len(self.features)))
+        query_weights = np.zeros((n_queries, len(self.features)))
+        feature_weights = self._weights(weights)
+        for q, query in enumerate(queries):
+            vector, active = self.transform(query)
+            vectors[q] = vector
+            query_weights[q, active] = feature_weights[active]
+
+        weighted = query_weights * vectors
+        distances = self.squared @ query_weights.T - 2 * (self.matrix @ weighted.T) + (weighted * vectors).sum(axis=1)
+        distances = np.maximum(distances.T, 0)  # 부동소수점 오차로 생긴 음수 제거
+
+        rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(distances, rows, axis=1)
+        order = np.argsort(top, axis=1, kind='stable')
+        rows = np.take_along_axis(rows, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        empty = ~query_weights.any(axis=1)
+        rows[empty], top[empty] = -1, np.inf
+        return rows, top
+
+    def similar_batch(self, queries, k=5, weights=None):
+        """
+        Returns one list of similar records per query, as in similar().
+        """
+        rows, distances = self.search_batch(queries, k, weights)
+        return [
+            [dict(self.records[row], similarity_score=float(distance))
+             for row, distance in zip(query_rows, query_distances) if row >= 0]
+            for query_rows, query_distances in zip(rows, distances)
+        ]
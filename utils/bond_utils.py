@@ -1,23 +1,47 @@
 # utils/bond_utils.py
 
+import os
+import math
 import pandas as pd
+import numpy as np
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from utils.bond_data import get_snapshot
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load data once when the module is imported
-df_bonds = pd.read_csv('data/issue_decision_regular_report.csv')
-df_quarterly = pd.read_csv('data/business_quarterly_report.csv')
-df_market = pd.read_csv('data/market_info.csv')
+# Similar-bond results kept per (data version, query)
+SIMILAR_BONDS_CACHE_SIZE = int(os.getenv("SIMILAR_BONDS_CACHE_SIZE", 256))
 
-def load_bond_data(filepath='data/bond_data.csv'):
+# Queries scored together in one pass by the batch search
+SIMILAR_BONDS_BATCH_SIZE = int(os.getenv("SIMILAR_BONDS_BATCH_SIZE", 512))
+# Upper bound on num_similar accepted from clients
+SIMILAR_BONDS_MAX_RESULTS = int(os.getenv("SIMILAR_BONDS_MAX_RESULTS", 100))
+
+# Query term -> bond feature column
+SIMILARITY_QUERY_TERMS = {
+    'amount': '총발행금액 (₩)',
+    'interest_rate': '표면이자율 (%)',
+    'maturity_rate': '만기이자율 (%)',
+    'refixing_ratio': '리픽싱비율 (%)',
+    'call_ratio': '콜가능비율 (%)',
+}
+
+_similar_bonds_cache = OrderedDict()
+_similar_bonds_lock = threading.Lock()
+
+def load_bond_data(filepath=None):
     """
-    Loads bond data from a CSV file.
+    Returns the bond list. The default file is served from the in-memory snapshot
+    (read-only); another filepath is read from disk.
     """
     try:
+        if filepath is None:
+            return get_snapshot().df_bond_list
         bond_df = pd.read_csv(filepath)
         return bond_df
     except Exception as e:
@@ -42,108 +66,171 @@ def get_bond_opportunities(industry):
     print(filtered_bonds)
     return filtered_bonds.to_dict('records')
 
-def analyze_mezzanine_bonds():
-    df = pd.read_csv('data/issue_decision_regular_report.csv')
-    
-    analysis = {
-        'total_issues': len(df),
-        'avg_amount': df['총발행금액 (₩)'].mean(),
-        'avg_interest_rate': df['표면이자율 (%)'].mean(),
-        'most_common_issuer': df['발행대상 회사'].mode().iloc[0],
-        'recent_issues': df.sort_values('발행일', ascending=False).head(5).to_dict('records')
-    }
-    
-    return analysis
+def analyze_mezzanine_bonds(as_of=None):
+    """
+    Returns the mezzanine issuance analytics as of a date (default today): totals,
+    monthly and per-issuer volume and coupon distributions, yields to put and the
+    refixing exposure of outstanding bonds. Cached per data version and date.
+    """
+    return get_snapshot().mezzanine.analysis(as_of)
+
+def get_maturity_calendar(event='maturity', freq='month', months=None, as_of=None):
+    """
+    Returns the calendar bins of bond maturities, put dates or call dates from as_of
+    (default today) on, by month or quarter with running totals. With months, also
+    returns the bonds and issuers whose event falls within the next months from as_of.
+    Raises ValueError for an unknown event or frequency.
+    """
+    calendar = get_snapshot().maturity_calendar
+    result = {'event': event, 'freq': freq, **calendar.calendar(event, freq, as_of)}
+    if months is not None:
+        result['due'] = calendar.due_within(months, event, as_of)
+    return result
 
 def get_potential_issuers(min_market_cap=0, max_debt_ratio=float('inf'), min_shareholder_ratio=0, months_to_maturity=9, max_results=10):
+    """
+    Range lookups on the precomputed issuer universe.
+    months_to_maturity=None skips the outstanding bond maturity filter; bonds that
+    have already matured never count as outstanding.
+    """
     try:
-        today = datetime.now()
-        maturity_date = today + timedelta(days=30*months_to_maturity)
-        
-        # Split '종목명' and take the first part
-        df_bonds['종목명'] = df_bonds['종목명'].str.split().str[0]
-
-        # 데이터 병합
-        df_combined = pd.merge(df_market, df_quarterly, on='종목명', how='inner')
-        # df_combined = pd.merge(df_combined, df_bonds[['종목명', '기발행사채만기일']], on='종목명', how='left')
-        
-        logger.info(f"Total companies before filtering: {len(df_combined)}")
-        logger.debug(f"Columns in df_combined: {df_combined.columns}")
-        
-        # 최신 분기 데이터 선택
-        latest_quarter = df_combined.filter(regex=r'\d분기 매출액').columns[-1]
-        latest_profit = latest_quarter.replace('매출액', '영업이익')
-        
-        # 기본 필터링
-        potential_issuers = df_combined[
-            (df_combined['시가총액 (₩)'] >= min_market_cap) &
-            (df_combined['부채비율'] <= max_debt_ratio) &
-            (df_combined['대주주 지분율(%)'] >= min_shareholder_ratio)
+        ranges = [
+            ('시가총액 (₩)', min_market_cap, np.inf),
+            ('부채비율', -np.inf, max_debt_ratio),
+            ('대주주 지분율(%)', min_shareholder_ratio, np.inf),
         ]
-        
+        # 이미 만기가 지난 채권은 제외하도록 오늘을 하한으로 사용
+        today = float(pd.Timestamp.now().normalize().value)
+        if months_to_maturity is not None:
+            maturity_date = datetime.now() + timedelta(days=30*months_to_maturity)
+            ranges.append(('기발행사채만기일', today, float(pd.Timestamp(maturity_date).value)))
+
+        potential_issuers = get_snapshot().issuer_universe.query(ranges, max_results, maturities_from=today)
         logger.info(f"Companies after all filtering: {len(potential_issuers)}")
-        
-        # '기발행사채만기일' 컬럼 확인 및 처리
-        if '기발행사채만기일' in potential_issuers.columns:
-            potential_issuers['기발행사채만기일'] = pd.to_datetime(potential_issuers['기발행사채만기일'], errors='coerce', format='%Y-%m-%d')
-            potential_issuers = potential_issuers[potential_issuers['기발행사채만기일'] <= maturity_date]
-            logger.info(f"Companies after maturity date filtering: {len(potential_issuers)}")
-        else:
-            logger.warning("'기발행사채만기일' column not found in the dataset")
-        
-        # 정렬 및 결과 제한
-        potential_issuers = potential_issuers.sort_values('시가총액 (₩)', ascending=False).head(max_results)
-        
-        result_columns = ['종목명', '주가 (₩)', '시가총액 (₩)', latest_quarter, latest_profit, '부채비율', '대주주 지분율(%)']
-        if '기발행사채만기일' in potential_issuers.columns:
-            result_columns.append('기발행사채만기일')
-        
-        logger.debug(f"Final columns in result: {result_columns}")
-        
-        return potential_issuers[result_columns].to_dict('records')
+        return potential_issuers
     except Exception as e:
         logger.error(f"Error in get_potential_issuers: {str(e)}")
         return []
 
-def get_similar_mezzanine_bonds(amount, interest_rate, num_similar=5, amount_tolerance=0.3, interest_rate_tolerance=2):
-    # Calculate the lower and upper bounds for amount and interest rate
-    amount_lower = amount * (1 - amount_tolerance)
-    amount_upper = amount * (1 + amount_tolerance)
-    interest_rate_lower = interest_rate - (interest_rate_tolerance / 100)
-    interest_rate_upper = interest_rate + (interest_rate_tolerance / 100)
-    
-    # Filter bonds within the specified ranges
-    similar_bonds = df_bonds[
-        (df_bonds['총발행금액 (₩)'].between(amount_lower, amount_upper)) | 
-        (df_bonds['표면이자율 (%)'].between(interest_rate_lower, interest_rate_upper))
-    ]
-    
-    # Calculate differences
-    similar_bonds.loc[:, 'amount_diff'] = abs(similar_bonds['총발행금액 (₩)'] - amount) / amount
-    similar_bonds.loc[:, 'interest_rate_diff'] = abs(similar_bonds['표면이자율 (%)'] - interest_rate)
-    
-    # Calculate a combined similarity score (lower is more similar)
-    similar_bonds.loc[:, 'similarity_score'] = similar_bonds['amount_diff'] + similar_bonds['interest_rate_diff']
-    
-    # Sort by similarity score and select top matches
-    similar_bonds = similar_bonds.sort_values('similarity_score').head(num_similar)
-    
-    # 시가총액 정보 추가
-    similar_bonds = pd.merge(similar_bonds, df_market[['종목명', '시가총액 (₩)']], on='종목명', how='left')
-    
-    print(f"Total bonds before filtering: {len(df_bonds)}")
-    print(f"Bonds within amount range: {len(df_bonds[(df_bonds['총발행금액 (₩)'].between(amount_lower, amount_upper))])}")
-    print(f"Bonds within interest rate range: {len(df_bonds[(df_bonds['표면이자율 (%)'].between(interest_rate_lower, interest_rate_upper))])}")
-    print(f"Similar bonds found: {len(similar_bonds)}")
-    
-    return similar_bonds.to_dict('records')
+def get_latest_quarter_columns():
+    """Returns the (sales, operating profit) columns of the latest quarter in issuer records."""
+    universe = get_snapshot().issuer_universe
+    return universe.latest_quarter, universe.latest_profit
+
+def _feature_query(query):
+    return {column: query.get(term) for term, column in SIMILARITY_QUERY_TERMS.items()}
+
+def _add_differences(similar_bonds, query):
+    for bond in similar_bonds:
+        bond['amount_diff'] = abs(bond['총발행금액 (₩)'] - query['amount']) / query['amount']
+        bond['interest_rate_diff'] = abs(bond['표면이자율 (%)'] - query['interest_rate'])
+
+def parse_similarity_queries(rows):
+    """
+    Converts rows of query terms (JSON objects or CSV rows) into queries for
+    iter_similar_mezzanine_bonds. amount and interest_rate are required; the other
+    terms in SIMILARITY_QUERY_TERMS are optional.
+    Raises ValueError naming the first invalid row.
+    """
+    if not isinstance(rows, list):
+        raise ValueError("Expected a list of queries.")
+    queries = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"Query {i} is not an object.")
+        query = {}
+        for term in SIMILARITY_QUERY_TERMS:
+            value = row.get(term)
+            if value is None or value == '':
+                if term in ('amount', 'interest_rate'):
+                    raise ValueError(f"Query {i} is missing {term}.")
+                continue
+            try:
+                query[term] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Query {i} has an invalid {term}: {value!r}")
+            if isinstance(value, bool) or not math.isfinite(query[term]):
+                raise ValueError(f"Query {i} has an invalid {term}: {value!r}")
+        if not query['amount'] > 0:
+            raise ValueError(f"Query {i} has a non-positive amount.")
+        queries.append(query)
+    return queries
+
+def parse_num_similar(value):
+    """
+    Validates the number of similar bonds requested: an integer (or integer string)
+    between 1 and SIMILAR_BONDS_MAX_RESULTS. Raises ValueError otherwise.
+    """
+    number = None
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        number = int(value.strip())
+    elif isinstance(value, int) and not isinstance(value, bool):
+        number = value
+    elif isinstance(value, float) and value.is_integer():
+        number = int(value)
+    if number is None:
+        raise ValueError(f"num_similar must be an integer, got {value!r}.")
+    if not 1 <= number <= SIMILAR_BONDS_MAX_RESULTS:
+        raise ValueError(f"num_similar must be between 1 and {SIMILAR_BONDS_MAX_RESULTS}.")
+    return number
+
+def iter_similar_mezzanine_bonds(queries, num_similar=5, weights=None, batch_size=SIMILAR_BONDS_BATCH_SIZE):
+    """
+    Yields (query, similar_bonds) for each query from parse_similarity_queries, in
+    order. Queries are scored batch_size at a time in one vectorized pass, all
+    against the same data version.
+    """
+    engine = get_snapshot().similar_bonds
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        results = engine.similar_batch([_feature_query(query) for query in batch], num_similar, weights)
+        for query, similar_bonds in zip(batch, results):
+            _add_differences(similar_bonds, query)
+            yield query, similar_bonds
+
+def get_similar_mezzanine_bonds(amount, interest_rate, num_similar=5, maturity_rate=None, refixing_ratio=None,
+                                call_ratio=None, weights=None):
+    """
+    Returns the num_similar bonds whose terms are closest to the given ones, with the
+    issuer's market cap. Terms left as None are not compared; weights overrides
+    DEFAULT_SIMILARITY_WEIGHTS per feature column.
+    Results are memoized per data version, so the page and its chart share one search.
+    Raises ValueError when amount is not positive or a term is not a finite number.
+    """
+    terms = {'amount': amount, 'interest_rate': interest_rate, 'maturity_rate': maturity_rate,
+             'refixing_ratio': refixing_ratio, 'call_ratio': call_ratio}
+    for term, value in terms.items():
+        if value is not None and not math.isfinite(value):
+            raise ValueError(f"{SIMILARITY_QUERY_TERMS[term]} 값이 올바르지 않습니다: {value}")
+    if not amount > 0:
+        raise ValueError("발행금액은 0보다 커야 합니다.")
+    snapshot = get_snapshot()
+    key = (snapshot.version, amount, interest_rate, num_similar, maturity_rate, refixing_ratio, call_ratio,
+           tuple(sorted((weights or {}).items())))
+    with _similar_bonds_lock:
+        similar_bonds = _similar_bonds_cache.get(key)
+        if similar_bonds is not None:
+            _similar_bonds_cache.move_to_end(key)
+
+    if similar_bonds is None:
+        query = terms
+        similar_bonds = snapshot.similar_bonds.similar(_feature_query(query), num_similar, weights)
+        _add_differences(similar_bonds, query)
+        logger.info(f"Similar bonds found: {len(similar_bonds)}")
+
+        with _similar_bonds_lock:
+            # 데이터 버전이 바뀌면 이전 버전의 결과는 더 이상 조회되지 않으므로 제거
+            for stale in [k for k in _similar_bonds_cache if k[0] != snapshot.version]:
+                del _similar_bonds_cache[stale]
+            _similar_bonds_cache[key] = similar_bonds
+            while len(_similar_bonds_cache) > SIMILAR_BONDS_CACHE_SIZE:
+                _similar_bonds_cache.popitem(last=False)
+
+    return [dict(bond) for bond in similar_bonds]
 
 def get_market_overview():
-    total_market_cap = df_market['시가총액 (₩)'].sum()
-    avg_shareholder_ratio = df_quarterly['대주주 지분율(%)'].mean()
-    
-    return {
-        'total_market_cap': total_market_cap,
-        'avg_shareholder_ratio': avg_shareholder_ratio,
-        'num_companies': len(df_market)
-    }
+    """
+    Returns the market aggregates of the current data version: totals, averages,
+    per-산업군 breakdowns and percentiles. Computed once per version.
+    """
+    return get_snapshot().market_stats.overview()
@@ -0,0 +1,132 @@
+# utils/document_store.py
+
+import os
+import csv
+import json
+import logging
+import threading
+from array import array
+from utils.embedding_utils import EMBEDDING_CACHE_DIR, document_hash, load_or_build_embeddings
+from utils.vector_index import build_index
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DOCUMENT_DIR = os.getenv("DOCUMENT_DIR", "data/documents")
+DOCUMENT_CSV = os.getenv("DOCUMENT_CSV", "data/news_articles.csv")
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", 200))
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", 40))
+
+
+def iter_csv_documents(path=DOCUMENT_CSV):
+    """
+    Yields (source, text) for each row of a CSV with title and content columns.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            text = "\n".join(part for part in (row.get('title'), row.get('content')) if part)
+            if text.strip():
+                yield f"{os.path.basename(path)}#{row.get('id')}", text
+
+
+def iter_text_documents(directory=DOCUMENT_DIR):
+    """
+    Yields (source, text) for each .txt file in the directory, one file at a time.
+    """
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.txt'):
+            continue
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            text = f.read()
+        if text.strip():
+            yield name, text
+
+
+def iter_documents(csv_path=DOCUMENT_CSV, directory=DOCUMENT_DIR):
+    """
+    Streams documents from every configured source that exists.
+    """
+    if csv_path and os.path.exists(csv_path):
+        yield from iter_csv_documents(csv_path)
+    else:
+        logger.warning(f"Document CSV not found: {csv_path}")
+
+    if directory and os.path.isdir(directory):
+        yield from iter_text_documents(directory)
+    else:
+        logger.warning(f"Document directory not found: {directory}")
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    """
+    Splits text into overlapping chunks of at most chunk_words words.
+    """
+    words = text.split()
+    step = max(1, chunk_words - overlap)
+    for start in range(0, len(words), step):
+        yield " ".join(words[start:start + chunk_words])
+        if start + chunk_words >= len(words):
+            break
+
+
+class DocumentStore:
+    """
+    Chunked document corpus kept on disk.
+    Only chunk offsets and the vector index stay in memory; chunk text is read back
+    from the chunk file for the hits of each query.
+    """
+
+    def __init__(self, chunk_path, offsets):
+        self._chunk_path = chunk_path
+        self._offsets = offsets
+        self._file = open(chunk_path, 'rb')
+        self._lock = threading.Lock()
+        self.index = None
+
+    @classmethod
+    def build(cls, documents, encode, cache_dir=EMBEDDING_CACHE_DIR):
+        """
+        Chunks the streamed (source, text) documents into the chunk file, embeds the
+        chunks in batches (reusing cached embeddings) and builds the vector index.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        chunk_path = os.path.join(cache_dir, 'chunks.jsonl')
+        tmp_path = f"{chunk_path}.tmp.{os.getpid()}"
+
+        offsets = array('q')
+        hashes = []
+        with open(tmp_path, 'wb') as f:
+            for source, text in documents:
+                for i, chunk in enumerate(chunk_text(text)):
+                    offsets.append(f.tell())
+                    hashes.append(document_hash(chunk))
+                    record = {'source': source, 'chunk': i, 'text': chunk}
+                    f.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+        os.replace(tmp_path, chunk_path)
+        logger.info(f"Document store has {len(offsets)} chunks")
+
+        store = cls(chunk_path, offsets)
+        embeddings = load_or_build_embeddings(store, encode, cache_dir=cache_dir, doc_hashes=hashes)
+        store.index = build_index(embeddings)
+        return store
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        return self.get_chunk(i)['text']
+
+    def get_chunk(self, i):
+        """Reads one chunk record ({'source', 'chunk', 'text'}) from disk."""
+        with self._lock:
+            self._file.seek(self._offsets[i])
+            line = self._file.readline()
+        return json.loads(line)
+
+    def search(self, query_embedding, top_k=3):
+        """Returns the texts of the top_k chunks most similar to the query embedding."""
+        if not len(self):
+            return []
+        ids, _ = self.index.search(query_embedding, top_k)
+        return [self[int(i)] for i in ids]
@@ -0,0 +1,247 @@
+# utils/embedding_service.py
+#
+# Shared embedding worker: loads the sentence transformer once and serves every web
+# worker over a Unix socket, encoding concurrent requests together in one batch.
+# Usage: python -m utils.embedding_service [socket_path]
+# Web workers use it when EMBEDDING_SERVICE_SOCKET points at the same path.
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import threading
+import socketserver
+from concurrent.futures import Future
+import numpy as np
+from utils.embedding_utils import EMBEDDING_MODEL_NAME
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Socket of the embedding service; empty means each process loads its own model
+EMBEDDING_SERVICE_SOCKET = os.getenv("EMBEDDING_SERVICE_SOCKET", "")
+EMBEDDING_SERVICE_DEFAULT_SOCKET = "/tmp/etf-bond-advisor-embeddings.sock"
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", 30))
+# Pending connections the service accepts before clients are refused
+EMBEDDING_SERVICE_BACKLOG = int(os.getenv("EMBEDDING_SERVICE_BACKLOG", 128))
+EMBEDDING_SERVICE_CONNECT_RETRIES = 5
+# Texts encoded together, and how long the first request waits for others to join
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 64))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5))
+
+# Message framing: header length and payload length, then the JSON header and raw payload
+_FRAME = struct.Struct('!II')
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def send_message(sock, header, payload=b''):
+    """Sends a JSON header and an optional binary payload as one frame."""
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(encoded), len(payload)) + encoded + payload)
+
+
+def recv_message(sock):
+    """Receives one frame and returns (header, payload)."""
+    header_size, payload_size = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+    header = json.loads(_recv_exactly(sock, header_size).decode('utf-8'))
+    return header, _recv_exactly(sock, payload_size) if payload_size else b''
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching front of an encode function. Texts submitted by concurrent callers
+    are collected for up to max_wait_ms (or until max_size texts are waiting) and
+    encoded in one call; each caller gets its own rows back through a Future.
+    """
+
+    def __init__(self, encode, max_size=EMBEDDING_BATCH_MAX_SIZE, max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS):
+        self._encode = encode
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            # fork 이후에는 자식 프로세스에서 배치 스레드를 새로 시작
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name='embedding-batcher', daemon=True).start()
+                self._worker_pid = os.getpid()
+            return self._queue
+
+    def submit(self, texts):
+        """
+        Queues the texts and returns a Future of their float32 embedding rows.
+        """
+        future = Future()
+        self._ensure_worker().put((list(texts), future))
+        return future
+
+    def encode(self, texts):
+        """Blocking submit for synchronous callers."""
+        return self.submit(texts).result()
+
+    def _collect(self, requests):
+        pending = [requests.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        requests = self._queue
+        while True:
+            pending = self._collect(requests)
+            texts = [text for batch, _ in pending for text in batch]
+            try:
+                vectors = np.asarray(self._encode(texts), dtype=np.float32) if texts else np.empty((0, 0), np.float32)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for batch, future in pending:
+                future.set_result(vectors[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            try:
+                vectors = self.server.batcher.encode(header['texts'])
+                send_message(self.request, {'shape': list(vectors.shape)}, vectors.tobytes())
+            except Exception as e:
+                logger.error(f"Error encoding {len(header.get('texts', []))} texts: {e}")
+                send_message(self.request, {'error': str(e)})
+
+
+class _EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # 여러 워커가 동시에 연결해도 거부되지 않도록 대기열을 늘림 (기본값 5)
+    request_queue_size = EMBEDDING_SERVICE_BACKLOG
+
+
+def serve(socket_path=EMBEDDING_SERVICE_DEFAULT_SOCKET, encode=None):
+    """
+    Serves embeddings on the Unix socket until interrupted.
+    encode defaults to the sentence transformer model, loaded once here.
+    """
+    if encode is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        encode = lambda texts: model.encode(texts, batch_size=EMBEDDING_BATCH_MAX_SIZE)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = _EmbeddingServer(socket_path, _EmbeddingRequestHandler)
+    server.batcher = EmbeddingBatcher(encode)
+    logger.info(f"Embedding service listening on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class RemoteEncoder:
+    """
+    Stand-in for SentenceTransformer.encode that asks the embedding service.
+    Keeps one connection per thread and process, reconnecting once on failure.
+    """
+
+    def __init__(self, socket_path=EMBEDDING_SERVICE_SOCKET, timeout=EMBEDDING_SERVICE_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None or self._local.pid != os.getpid():
+            sock = self._connect()
+            self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _connect(self):
+        # 블로킹 모드에서 연결한 뒤 타임아웃을 설정 (타임아웃이 있으면 Unix 소켓 connect가
+        # 대기열이 찼을 때 기다리지 않고 EAGAIN으로 실패함)
+        for attempt in range(EMBEDDING_SERVICE_CONNECT_RETRIES):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except BlockingIOError:
+                sock.close()
+                if attempt + 1 >= EMBEDDING_SERVICE_CONNECT_RETRIES:
+                    raise
+                time.sleep(0.01 * 2 ** attempt)
+                continue
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(self.timeout)
+            return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def encode(self, texts, **kwargs):
+        """
+        Returns the float32 embeddings of the texts (one row for a single string).
+        Raises OSError when the service cannot be reached and RuntimeError when it fails.
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, {'texts': texts})
+                header, payload = recv_message(sock)
+                break
+            except (ConnectionError, OSError):
+                self._close()
+                if attempt:
+                    raise
+        if 'error' in header:
+            raise RuntimeError(f"Embedding service error: {header['error']}")
+        vectors = np.frombuffer(payload, dtype=np.float32).reshape(header['shape'])
+        return vectors[0] if single else vectors
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1] if len(sys.argv) > 1 else (EMBEDDING_SERVICE_SOCKET or EMBEDDING_SERVICE_DEFAULT_SOCKET))
@@ -0,0 +1,142 @@
+# utils/embedding_utils.py
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embeddings")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+# Bump when the on-disk layout changes so stale artifacts are not reused
+EMBEDDING_ARTIFACT_VERSION = 2
+
+
+def document_hash(text):
+    """
+    Returns the content hash of a single document.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def corpus_hash(doc_hashes, model_name=EMBEDDING_MODEL_NAME):
+    """
+    Returns a hash identifying the whole corpus, the model and the artifact version.
+    """
+    digest = hashlib.sha256(f"v{EMBEDDING_ARTIFACT_VERSION}:{model_name}".encode('utf-8'))
+    for h in doc_hashes:
+        digest.update(h.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _manifest_path(cache_dir, model_name):
+    return os.path.join(cache_dir, f"{model_name}.manifest.json")
+
+
+def _load_manifest(cache_dir, model_name):
+    path = _manifest_path(cache_dir, model_name)
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('version') != EMBEDDING_ARTIFACT_VERSION:
+        return None
+    return manifest
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def load_or_build_embeddings(documents, encode, model_name=EMBEDDING_MODEL_NAME, cache_dir=EMBEDDING_CACHE_DIR,
+                             doc_hashes=None, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Returns the L2-normalized embedding matrix for the documents as a read-only
+    memory-mapped array.
+    The matrix is stored as a .npy artifact keyed by the corpus hash. When the corpus
+    changes, rows of unchanged documents are reused and only new or changed documents
+    are passed to encode, batch_size at a time.
+    documents only needs len() and indexing; doc_hashes can be passed when the caller
+    has already hashed them.
+    """
+    if doc_hashes is None:
+        doc_hashes = [document_hash(doc) for doc in documents]
+    key = corpus_hash(doc_hashes, model_name)
+    artifact_name = f"{model_name}-{key[:16]}.npy"
+    artifact_path = os.path.join(cache_dir, artifact_name)
+
+    if os.path.exists(artifact_path):
+        logger.info(f"Loading document embeddings from {artifact_path}")
+        return np.load(artifact_path, mmap_mode='r')
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # 이전 아티팩트에서 변경되지 않은 문서의 임베딩 재사용
+    reusable = {}
+    previous = _load_manifest(cache_dir, model_name)
+    previous_path = None
+    if previous:
+        previous_path = os.path.join(cache_dir, previous['artifact'])
+        try:
+            previous_embeddings = np.load(previous_path, mmap_mode='r')
+            reusable = {h: i for i, h in enumerate(previous['hashes'])}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not reuse previous embeddings {previous_path}: {e}")
+
+    missing = [i for i, h in enumerate(doc_hashes) if h not in reusable]
+    logger.info(f"Encoding {len(missing)} of {len(doc_hashes)} documents "
+                f"({len(doc_hashes) - len(missing)} reused)")
+
+    embeddings = None
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        vectors = np.asarray(encode([documents[i] for i in batch]), dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.empty((len(doc_hashes), vectors.shape[1]), dtype=np.float32)
+        embeddings[batch] = vectors
+
+    if reusable and len(missing) < len(doc_hashes):
+        if embeddings is None:
+            embeddings = np.empty((len(doc_hashes), previous_embeddings.shape[1]), dtype=np.float32)
+        rows = [i for i, h in enumerate(doc_hashes) if h in reusable]
+        embeddings[rows] = previous_embeddings[[reusable[doc_hashes[i]] for i in rows]]
+
+    if embeddings is None:
+        embeddings = np.empty((0, 0), dtype=np.float32)
+
+    # 정규화된 행으로 저장해 검색 인덱스가 메모리 맵을 복사 없이 그대로 사용하도록 함
+    # (여러 워커 프로세스가 같은 페이지 캐시를 공유)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings /= norms
+
+    _write_atomic(artifact_path, lambda f: np.save(f, embeddings))
+    manifest = {
+        'version': EMBEDDING_ARTIFACT_VERSION,
+        'model': model_name,
+        'artifact': artifact_name,
+        'corpus_hash': key,
+        'hashes': doc_hashes,
+    }
+    _write_atomic(_manifest_path(cache_dir, model_name),
+                  lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+
+    # 대체된 이전 아티팩트 정리
+    if previous_path and previous_path != artifact_path:
+        try:
+            os.remove(previous_path)
+        except OSError:
+            pass
+
+    return np.load(artifact_path, mmap_mode='r')
@@ -4,54 +4,64 @@ import pandas as pd
 from utils.openai_utils import generate_etf_recommendations
 from utils.openai_utils import get_news_content
 from utils.openai_utils import generate_etf_recommendations_for_keywords
+from utils.openai_utils import stream_etf_recommendations, stream_etf_recommendations_for_keywords
+from utils.json_stream import JSONObjectStream
+from utils.fetch_utils import fetch_article
+from utils.extract_utils import extract_article
+from utils.prompt_budget import truncate_to_tokens
+from utils.job_queue import job_queue
 import requests
-from transformers import GPT2Tokenizer
-from bs4 import BeautifulSoup
-import yfinance as yf
 import logging
-import json
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def truncate_text_transformers(text, model_name='gpt2'):
+# Concurrency settings for multi-URL insight requests
+ETF_INSIGHT_MAX_WORKERS = int(os.getenv("ETF_INSIGHT_MAX_WORKERS", 4))
+ETF_INSIGHT_TIMEOUT = float(os.getenv("ETF_INSIGHT_TIMEOUT", 120))
+
+# Fields of an ETF object in the ChatGPT response: (accepted types, required)
+ETF_SCHEMA = {
+    'ticker': (str, True),
+    'top5': (list, True),
+    'explanation': (str, True),
+    'holdings_weight': ((str, int, float, list, dict), False),
+    'expense_ratio': ((str, int, float), False),
+}
+
+# ChatGPT response parsing counters, reported by get_parse_stats()
+_parse_stats = {'responses': 0, 'valid_objects': 0, 'invalid_objects': 0, 'malformed_objects': 0,
+                'salvaged_responses': 0, 'failed_responses': 0}
+_parse_stats_lock = threading.Lock()
+
+def truncate_text_transformers(text, model_name='gpt2', max_tokens=10000):
     """
     필요시 사용...
     When dynamically identifying article content from different URLs..
     Truncates article text according to API quota.
+    Uses the per-process cached tokenizer from prompt_budget.
     """
-
-    tokenizer = GPT2Tokenizer.from_pretrained(model_name)
-    tokens = tokenizer.encode(text)
-    
-    if len(tokens) < 10000:
-        return text  # No truncation needed
-    
-    truncated_tokens = tokens[:10000]
-    truncated_text = tokenizer.decode(truncated_tokens, clean_up_tokenization_spaces=True)
-    
-    return truncated_text
+    return truncate_to_tokens(text, max_tokens, model_name)
 
 
 def scrape_article(url):
     """
     Scrapes the article text from the given URL.
+    Uses the pooled, cached fetcher so repeat submissions skip the network and the parse,
+    and the site extraction rules in extract_utils for the article body.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise exception for HTTP errors
-
         # text = response.content.decode('utf-8')
         # truncated_text = truncate_text_transformers(text)
         # article = get_news_content(truncated_text)
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        article = soup.find('article', {'class': 'go_trans _article_content', 'id': 'dic_area'})
-
-        for tag in article(['img', 'em', 'span', 'div']):
-            tag.decompose()
+        article = fetch_article(url, lambda content: extract_article(content, url))
 
         if not article:
             logger.error(f"Could not find the article content in URL: {url}")
@@ -76,55 +86,74 @@ def analyze_text_with_chatgpt(text):
 
 
 
-def parse_chatgpt_response(response, keywords=None):
+def validate_etf(etf):
     """
-    Parses the ChatGPT response, expected to be in JSON format, and extracts ETF information.
-    If the response is a string, it tries to load it as JSON.
+    Checks one ETF object from the ChatGPT response against ETF_SCHEMA.
+    Returns the list of problems, empty when the object is valid.
     """
-    # Handle the case where GPT response indicates no relevance
-    if response == 'NO_RELEVANT_ETFS_FOUND':
-        return '해당 기사와 관련된 ETF가 없습니다'
-    
-    response = "[" + response + "]"
-    
-    print("RESPONSE: ", response)
-
-    try:
-        response_json = json.loads(response)
-    except json.JSONDecodeError:
-        return '응답을 구문 분석할 수 없습니다.'
-
-    def process_etf(etf):
-        ticker = etf.get('ticker', '').upper()
-        top5 = etf.get('top5', [])
-        explanation = etf.get('explanation', '')
-        holdings_weight = etf.get('holdings_weight', '')
-        expense_ratio = etf.get('expense_ratio', '')
-
-        if len(ticker) <= 5 and top5 and explanation:
-            etf_info = {
-                'ticker': ticker,
-                'top5': top5,
-                'explanation': explanation,
-                'holdings_weight': holdings_weight,
-                'expense_ratio': expense_ratio
-            }
-            if keywords:
-                etf_info['search_keywords'] = ', '.join(keywords)
-            return etf_info
+    problems = []
+    for field, (types, required) in ETF_SCHEMA.items():
+        value = etf.get(field)
+        if value is None or value == '' or value == []:
+            if required:
+                problems.append(f"missing {field}")
+        elif isinstance(value, bool) or not isinstance(value, types):
+            problems.append(f"{field} is {type(value).__name__}")
+    ticker = etf.get('ticker')
+    if isinstance(ticker, str) and len(ticker.strip()) > 5:
+        problems.append("ticker is longer than 5 characters")
+    return problems
+
+def process_etf(etf, keywords=None):
+    """
+    Validates one ETF object from the ChatGPT response and returns the ETF information,
+    or None when it does not match the schema.
+    """
+    problems = validate_etf(etf)
+    if problems:
+        logger.warning(f"Skipping invalid ETF object ({', '.join(problems)})")
         return None
 
-    if isinstance(response_json, list):
-        etf_list = [process_etf(etf) for etf in response_json if process_etf(etf)]
-        return etf_list if etf_list else '응답에 유효한 ETF 정보가 없습니다.'
-    
-    elif isinstance(response_json, dict):
-        etf_info = process_etf(response_json)
-        return [etf_info] if etf_info else '응답에 유효한 ETF 정보가 없습니다.'
-
-    return '응답에 유효한 ETF 정보가 없습니다.'
-
+    etf_info = {
+        'ticker': etf['ticker'].strip().upper(),
+        'top5': etf['top5'],
+        'explanation': etf['explanation'],
+        'holdings_weight': etf.get('holdings_weight') or '',
+        'expense_ratio': etf.get('expense_ratio') or '',
+    }
+    if keywords:
+        etf_info['search_keywords'] = ', '.join(keywords)
+    return etf_info
+
+def _record_parse(parser, valid, invalid, no_relevant):
+    with _parse_stats_lock:
+        _parse_stats['responses'] += 1
+        _parse_stats['valid_objects'] += valid
+        _parse_stats['invalid_objects'] += invalid
+        _parse_stats['malformed_objects'] += len(parser.errors)
+        if valid and (invalid or parser.errors):
+            _parse_stats['salvaged_responses'] += 1
+        elif not valid and not no_relevant:
+            _parse_stats['failed_responses'] += 1
+
+def get_parse_stats():
+    """Returns the ChatGPT response parsing counters."""
+    with _parse_stats_lock:
+        return dict(_parse_stats)
 
+def parse_chatgpt_response(response, keywords=None):
+    """
+    Parses the ChatGPT response and extracts the ETF information.
+    Each ETF object is parsed and validated on its own, so malformed or invalid
+    objects are skipped and the valid ones are still returned.
+    Returns the list of ETFs, or a message when there is none.
+    """
+    etfs = []
+    for kind, payload in stream_parsed_etfs([response], keywords):
+        if kind == 'message':
+            return etfs or payload
+        etfs.append(payload)
+    return etfs
 
 def get_etf_insights(url):
     """
@@ -161,5 +190,155 @@ def get_etf_insights_from_keywords(keywords):
     
     return parsed_response
 
+def stream_parsed_etfs(pieces, keywords=None):
+    """
+    Parses streamed ChatGPT output and yields ('etf', etf_info) as soon as each ETF
+    object is complete and valid, or ('message', text) when there is nothing to show.
+    """
+    parser = JSONObjectStream()
+    valid = invalid = 0
+
+    def validated(etfs):
+        nonlocal valid, invalid
+        for etf in etfs:
+            etf_info = process_etf(etf, keywords) if isinstance(etf, dict) else None
+            if etf_info:
+                valid += 1
+                yield 'etf', etf_info
+            else:
+                invalid += 1
+
+    try:
+        for piece in pieces:
+            yield from validated(parser.feed(piece))
+    except Exception as e:
+        logger.error(f"Error while streaming ETF recommendations: {e}")
+        yield 'message', "ETF 추천을 가져오는 데 실패했습니다."
+        return
+
+    # 닫히지 않은 객체 뒤에 있던 정상 객체들
+    yield from validated(parser.close())
+    no_relevant = 'NO_RELEVANT_ETFS_FOUND' in parser.outside_text
+    _record_parse(parser, valid, invalid, no_relevant and not valid)
+    if parser.errors or invalid:
+        logger.warning(f"Parsed ETF response with {valid} valid, {invalid} invalid "
+                       f"and {len(parser.errors)} malformed objects")
+    if not valid:
+        if no_relevant:
+            yield 'message', '해당 기사와 관련된 ETF가 없습니다'
+        elif parser.errors:
+            yield 'message', '응답을 구문 분석할 수 없습니다.'
+        else:
+            yield 'message', '응답에 유효한 ETF 정보가 없습니다.'
+
+def stream_etf_insights(url):
+    """
+    Streaming variant of get_etf_insights.
+    Yields ('etf', etf_info) or ('message', text) events.
+    """
+    article_text = scrape_article(url)
+    if not article_text:
+        yield 'message', "해당 기사 내용을 가져오지 못했습니다."
+        return
+
+    yield from stream_parsed_etfs(stream_etf_recommendations(article_text))
+
+def stream_etf_insights_from_keywords(keywords):
+    """
+    Streaming variant of get_etf_insights_from_keywords.
+    Yields ('etf', etf_info) or ('message', text) events.
+    """
+    yield from stream_parsed_etfs(stream_etf_recommendations_for_keywords(keywords), keywords)
 
+def get_etf_insights_for_urls(urls, max_workers=None, timeout=None):
+    """
+    Runs get_etf_insights for several URLs concurrently.
+    Returns a list of (url, insights) tuples in the same order as the input URLs.
+    A URL that raises or misses the deadline gets an error message instead of insights.
+    """
+    if not urls:
+        return []
+
+    max_workers = max_workers or ETF_INSIGHT_MAX_WORKERS
+    timeout = timeout if timeout is not None else ETF_INSIGHT_TIMEOUT
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix='etf-insight')
+    try:
+        futures = [executor.submit(get_etf_insights, url) for url in urls]
+        # 전체 요청에 대한 마감 시간
+        wait(futures, timeout=timeout)
+
+        results = []
+        for url, future in zip(urls, futures):
+            if not future.done():
+                future.cancel()
+                logger.warning(f"Timed out analyzing URL {url} after {timeout} seconds")
+                results.append((url, "기사 분석 시간이 초과되었습니다."))
+                continue
+            try:
+                results.append((url, future.result()))
+            except Exception as e:
+                logger.error(f"Error analyzing URL {url}: {e}")
+                results.append((url, "기사 분석 중 오류가 발생했습니다."))
+        return results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def stream_etf_insights_for_urls(urls, max_workers=None, timeout=None):
+    """
+    Streams the insights of several URLs analyzed concurrently on the same bounded
+    pool as get_etf_insights_for_urls. Yields (url, kind, payload) events in the
+    order they are produced; a URL that raises or misses the deadline gets an error
+    message instead.
+    """
+    if not urls:
+        return
+
+    max_workers = max_workers or ETF_INSIGHT_MAX_WORKERS
+    timeout = timeout if timeout is not None else ETF_INSIGHT_TIMEOUT
+    events = queue.Queue()
+
+    def produce(url):
+        try:
+            for kind, payload in stream_etf_insights(url):
+                events.put((url, kind, payload))
+        except Exception as e:
+            logger.error(f"Error analyzing URL {url}: {e}")
+            events.put((url, 'message', "기사 분석 중 오류가 발생했습니다."))
+        finally:
+            events.put((url, None, None))
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix='etf-insight')
+    try:
+        for url in urls:
+            executor.submit(produce, url)
+        # 전체 요청에 대한 마감 시간
+        deadline = time.monotonic() + timeout
+        pending = set(urls)
+        while pending:
+            try:
+                url, kind, payload = events.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if kind is None:
+                pending.discard(url)
+            else:
+                yield url, kind, payload
+
+        for url in urls:
+            if url in pending:
+                logger.warning(f"Timed out analyzing URL {url} after {timeout} seconds")
+                yield url, 'message', "기사 분석 시간이 초과되었습니다."
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def run_etf_insights_job(urls=None, keywords=None):
+    """
+    Background job handler for ETF insight requests.
+    Returns a list of {'url', 'insights'} for URLs, or the keyword insights.
+    """
+    if urls:
+        return [{'url': url, 'insights': insights} for url, insights in get_etf_insights_for_urls(urls)]
+    return get_etf_insights_from_keywords(keywords)
 
+job_queue.register('etf_insights', run_etf_insights_job)
@@ -0,0 +1,206 @@
+# utils/extract_utils.py
+
+import os
+import re
+import logging
+from collections import namedtuple
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the streaming tokenizer is used instead
+    etree = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 'lxml', 'stream' or 'auto' (lxml when installed)
+EXTRACT_ENGINE = os.getenv("EXTRACT_ENGINE", "auto")
+
+_FEED_SIZE = 16384
+
+ExtractionRule = namedtuple('ExtractionRule', ['tag', 'attrs', 'strip_tags'])
+"""
+Where the article body lives on a site: the element tag, attributes it must carry
+(a class value is matched as a single class token) and child tags to drop with
+their content.
+"""
+
+NAVER_NEWS_RULE = ExtractionRule('article', {'id': 'dic_area'}, ('img', 'em', 'span', 'div'))
+
+SITE_RULES = {
+    'n.news.naver.com': NAVER_NEWS_RULE,
+    'news.naver.com': NAVER_NEWS_RULE,
+    'm.news.naver.com': NAVER_NEWS_RULE,
+}
+
+DEFAULT_RULE = NAVER_NEWS_RULE
+
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+def register_rule(host, rule):
+    """
+    Registers the extraction rule for a host.
+    """
+    SITE_RULES[host.lower()] = rule
+
+
+def rule_for_url(url):
+    """
+    Returns the extraction rule for the URL's host, or DEFAULT_RULE.
+    """
+    host = (urlparse(url).hostname or '') if url else ''
+    return SITE_RULES.get(host.lower(), DEFAULT_RULE)
+
+
+def _attrs_match(attrs, wanted):
+    for name, value in wanted.items():
+        actual = attrs.get(name)
+        if actual is None:
+            return False
+        if name == 'class':
+            if value not in actual.split():
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+def _detect_encoding(content):
+    match = re.search(rb'charset=["\']?([\w-]+)', content[:4096])
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+
+def _decode(content):
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode(_detect_encoding(content), errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+
+def _join_text(pieces):
+    return '\n'.join(piece.strip() for piece in pieces if piece.strip())
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _StreamingExtractor(HTMLParser):
+    """
+    Tokenizes the page without building a tree, collecting text only inside the
+    target element and stopping as soon as that element is closed.
+    Open elements are kept on a stack so an end tag also closes the elements left
+    open inside it (optional end tags such as </p> and </li>), as browsers do.
+    """
+
+    def __init__(self, rule):
+        super().__init__(convert_charrefs=True)
+        self.rule = rule
+        self.pieces = []
+        self.found = False
+        self._open = []  # (tag, skipped) of the open elements, the target first
+        self._skip_depth = 0
+        self._run = []
+
+    def flush(self):
+        # 피드 경계에서 나뉜 텍스트를 태그 사이 단위로 다시 합침
+        if self._run:
+            self.pieces.append(''.join(self._run))
+            self._run = []
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if not self._open:
+            if tag == self.rule.tag and _attrs_match(dict(attrs), self.rule.attrs):
+                self.found = True
+                self._open = [(tag, False)]
+            return
+        if tag in _VOID_TAGS:
+            return
+        skipped = bool(self._skip_depth) or tag in self.rule.strip_tags
+        self._open.append((tag, skipped))
+        if skipped:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.flush()
+
+    def handle_endtag(self, tag):
+        self.flush()
+        if not self._open or tag in _VOID_TAGS:
+            return
+        if all(open_tag != tag for open_tag, _ in self._open):
+            return  # 여는 태그가 없는 종료 태그는 무시
+        # 종료 태그가 생략된 안쪽 요소(<p>, <li> 등)도 함께 닫음
+        while True:
+            open_tag, skipped = self._open.pop()
+            if skipped:
+                self._skip_depth -= 1
+            if open_tag == tag:
+                break
+        if not self._open:
+            raise _StopParsing()
+
+    def handle_data(self, data):
+        if self._open and not self._skip_depth:
+            self._run.append(data)
+
+
+def extract_with_stream(content, rule=DEFAULT_RULE):
+    """
+    Extracts the article text with the standard-library tokenizer.
+    Returns None when the target element is not found.
+    """
+    text = _decode(content)
+    parser = _StreamingExtractor(rule)
+    try:
+        for start in range(0, len(text), _FEED_SIZE):
+            parser.feed(text[start:start + _FEED_SIZE])
+        parser.close()
+    except _StopParsing:
+        pass
+    parser.flush()
+
+    if not parser.found:
+        return None
+    return _join_text(parser.pieces)
+
+
+def extract_with_lxml(content, rule=DEFAULT_RULE):
+    """
+    Extracts the article text with lxml's incremental HTML parser, feeding the page
+    in pieces and stopping once the target element has been closed.
+    Returns None when the target element is not found.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    parser = etree.HTMLPullParser(events=('end',), tag=rule.tag, encoding=_detect_encoding(content))
+    for start in range(0, len(content) + _FEED_SIZE, _FEED_SIZE):
+        if start < len(content):
+            parser.feed(content[start:start + _FEED_SIZE])
+        else:
+            parser.close()  # flush elements left open at the end of the page
+        for _, element in parser.read_events():
+            if _attrs_match(element.attrib, rule.attrs):
+                etree.strip_elements(element, *rule.strip_tags, with_tail=False)
+                return _join_text(element.itertext())
+    return None
+
+
+def extract_article(content, url=None, engine=None):
+    """
+    Extracts the article body text from a page using the rule registered for the
+    URL's host. Returns None when the article element is missing.
+    """
+    rule = rule_for_url(url)
+    engine = engine or EXTRACT_ENGINE
+    if engine == 'lxml' or (engine == 'auto' and etree is not None):
+        return extract_with_lxml(content, rule)
+    return extract_with_stream(content, rule)
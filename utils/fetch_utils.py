@@ -0,0 +1,194 @@
+# utils/fetch_utils.py
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", 3.05))
+FETCH_READ_TIMEOUT = float(os.getenv("FETCH_READ_TIMEOUT", 10))
+# Number of per-host pools kept and keep-alive connections per host
+FETCH_POOL_HOSTS = int(os.getenv("FETCH_POOL_HOSTS", 16))
+FETCH_POOL_MAXSIZE = int(os.getenv("FETCH_POOL_MAXSIZE", 8))
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", "data/http_cache")
+FETCH_ARTICLE_TTL = float(os.getenv("FETCH_ARTICLE_TTL", 86400))
+FETCH_ARTICLE_MEMORY_ENTRIES = int(os.getenv("FETCH_ARTICLE_MEMORY_ENTRIES", 256))
+
+USER_AGENT = "Mozilla/5.0 (compatible; etf-bond-advisor)"
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# Striped locks so concurrent fetches of the same URL run once
+_url_locks = [threading.Lock() for _ in range(64)]
+
+_articles = OrderedDict()
+_articles_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide requests session with keep-alive pools per host.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        # fork 이후에는 부모 프로세스의 커넥션을 공유하지 않도록 새 세션 생성
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_POOL_HOSTS, pool_maxsize=FETCH_POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def _cache_path(url, suffix):
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(FETCH_CACHE_DIR, key[:2], f"{key}{suffix}")
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_cached_response(url):
+    try:
+        with open(_cache_path(url, '.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(_cache_path(url, '.body'), 'rb') as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None, None
+    return meta, body
+
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else 0
+
+
+def _url_lock(url):
+    return _url_locks[hash(url) % len(_url_locks)]
+
+
+def fetch(url):
+    """
+    Returns the response body for the URL.
+    Responses are cached on disk and revalidated with If-None-Match /
+    If-Modified-Since; a 304 answer is served from the cache.
+    Raises requests.exceptions.RequestException on network or HTTP errors.
+    """
+    meta, body = _read_cached_response(url)
+    if meta and time.time() < meta.get('fetched_at', 0) + meta.get('max_age', 0):
+        return body
+
+    headers = {}
+    if meta:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = get_session().get(url, headers=headers, timeout=(FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT))
+
+    if response.status_code == 304 and body is not None:
+        logger.info(f"Not modified, using cached response for {url}")
+        meta['fetched_at'] = time.time()
+        meta['max_age'] = _max_age(response.headers.get('Cache-Control')) or meta.get('max_age', 0)
+        _write_atomic(_cache_path(url, '.json'), json.dumps(meta).encode('utf-8'))
+        return body
+
+    response.raise_for_status()
+
+    cache_control = response.headers.get('Cache-Control', '')
+    if 'no-store' not in cache_control:
+        new_meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'max_age': 0 if 'no-cache' in cache_control else _max_age(cache_control),
+            'fetched_at': time.time(),
+        }
+        _write_atomic(_cache_path(url, '.body'), response.content)
+        _write_atomic(_cache_path(url, '.json'), json.dumps(new_meta).encode('utf-8'))
+
+    return response.content
+
+
+def get_cached_article(url):
+    """
+    Returns the extracted article text cached for the URL, or None.
+    """
+    now = time.time()
+    with _articles_lock:
+        entry = _articles.get(url)
+        if entry and entry[0] > now:
+            _articles.move_to_end(url)
+            return entry[1]
+
+    try:
+        with open(_cache_path(url, '.article.json'), encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record.get('expires_at', 0) <= now:
+        return None
+
+    _remember_article(url, record['text'], record['expires_at'])
+    return record['text']
+
+
+def _remember_article(url, text, expires_at):
+    with _articles_lock:
+        _articles[url] = (expires_at, text)
+        _articles.move_to_end(url)
+        while len(_articles) > FETCH_ARTICLE_MEMORY_ENTRIES:
+            _articles.popitem(last=False)
+
+
+def cache_article(url, text):
+    """
+    Stores the extracted article text for the URL in memory and on disk.
+    """
+    expires_at = time.time() + FETCH_ARTICLE_TTL
+    _remember_article(url, text, expires_at)
+    record = {'url': url, 'text': text, 'expires_at': expires_at}
+    _write_atomic(_cache_path(url, '.article.json'), json.dumps(record, ensure_ascii=False).encode('utf-8'))
+
+
+def fetch_article(url, extract):
+    """
+    Returns the article text for the URL, fetching and running extract(content)
+    only when it is not cached. Concurrent calls for the same URL share one fetch.
+    Returns None when extract finds no article.
+    """
+    text = get_cached_article(url)
+    if text is not None:
+        return text
+
+    with _url_lock(url):
+        text = get_cached_article(url)
+        if text is not None:
+            return text
+
+        text = extract(fetch(url))
+        if text:
+            cache_article(url, text)
+        return text
@@ -0,0 +1,173 @@
+# utils/ingest_utils.py
+#
+# Converts the bond, quarterly and market CSV files into typed Parquet files.
+# Usage: python -m utils.ingest_utils [file.csv ...] (defaults to every file in TABLE_SCHEMAS)
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import threading
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; the CSV files are read directly instead
+    pyarrow = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNAR_DIR = os.getenv("COLUMNAR_DIR", "data/columnar")
+# Write the Parquet file when a loader finds it missing or built from other CSV contents
+INGEST_AUTO_CONVERT = os.getenv("INGEST_AUTO_CONVERT", "1") == "1"
+
+_QUARTERS = [f"{quarter}분기 {item} (₩)" for quarter in range(1, 6) for item in ('매출액', '영업이익')]
+
+# Explicit dtypes per source file; date columns are parsed as datetime64.
+# DART filings can leave any numeric cell blank, so counts and amounts are float64 (NaN)
+TABLE_SCHEMAS = {
+    'data/issue_decision_regular_report.csv': {
+        'dtypes': {
+            '종목명': 'string',
+            '회차': 'float64',
+            '총발행금액 (₩)': 'float64',
+            '사모공모여부': 'category',
+            '만기이자율 (%)': 'float64',
+            '표면이자율 (%)': 'float64',
+            '리픽싱비율 (%)': 'float64',
+            '콜가능비율 (%)': 'float64',
+            '발행자별인수금액 (₩)': 'float64',
+        },
+        'dates': ['결의일', '발행일', '풋옵션최초도래일', '콜옵션최초도래일', '기발행사채만기일'],
+    },
+    'data/business_quarterly_report.csv': {
+        'dtypes': {
+            '종목명': 'category',
+            '기업명': 'string',
+            '대주주 지분율(%)': 'float64',
+            '부채비율': 'float64',
+            **{column: 'float64' for column in _QUARTERS},
+        },
+        'dates': [],
+    },
+    'data/market_info.csv': {
+        'dtypes': {
+            '종목명': 'category',
+            '주가 (₩)': 'float64',
+            '52주 최고가 (₩)': 'float64',
+            '시가총액 (₩)': 'float64',
+            '산업군': 'category',
+            '거래량 (주)': 'float64',
+        },
+        'dates': [],
+    },
+    'data/bond_data.csv': {
+        'dtypes': {
+            '회사': 'category',
+            '산업': 'category',
+            '금액(원)': 'float64',
+        },
+        'dates': ['발행일', '만기일'],
+    },
+}
+
+_convert_lock = threading.Lock()
+
+
+def columnar_path(csv_path):
+    """
+    Returns the Parquet path for a CSV file.
+    """
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(COLUMNAR_DIR, f"{name}.parquet")
+
+
+def read_csv_typed(csv_path, columns=None):
+    """
+    Reads the CSV file with the explicit dtypes of its schema instead of type inference.
+    """
+    schema = TABLE_SCHEMAS.get(csv_path, {'dtypes': {}, 'dates': []})
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = [column for column in header if columns is None or column in columns]
+    dtypes = {column: dtype for column, dtype in schema['dtypes'].items() if column in usecols}
+    df = pd.read_csv(csv_path, usecols=usecols, dtype=dtypes)
+    for column in schema['dates']:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors='coerce', format='%Y-%m-%d')
+    return df[usecols]
+
+
+def source_key(csv_path):
+    """
+    Returns the fingerprint of the CSV contents and schema a Parquet file is built from.
+    """
+    schema = json.dumps(TABLE_SCHEMAS.get(csv_path), sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(schema.encode('utf-8'))
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def convert_csv(csv_path, parquet_path=None, key=None):
+    """
+    Writes the typed Parquet version of the CSV file and returns its path.
+    The source key is stored in the Parquet metadata to tell when it is stale.
+    """
+    parquet_path = parquet_path or columnar_path(csv_path)
+    # 내용을 읽기 전에 해시를 계산해야 변환 중 파일이 바뀌어도 다음 검사에서 다시 변환됨
+    key = key or source_key(csv_path)
+    table = pyarrow.Table.from_pandas(read_csv_typed(csv_path), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'source_key': key.encode('ascii')})
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    tmp_path = f"{parquet_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, parquet_path)
+    logger.info(f"Converted {csv_path} to {parquet_path} ({table.num_rows} rows)")
+    return parquet_path
+
+
+def _stored_key(parquet_path):
+    try:
+        metadata = pq.read_schema(parquet_path).metadata or {}
+    except (OSError, pyarrow.ArrowException):
+        return None
+    return metadata.get(b'source_key', b'').decode('ascii') or None
+
+
+def read_table(csv_path, columns=None):
+    """
+    Reads a data table, preferring its Parquet version with column projection and
+    memory mapping. A Parquet file that is missing or was built from other CSV
+    contents (by content hash, not mtime) is rebuilt from the CSV when
+    INGEST_AUTO_CONVERT is on; without pyarrow the CSV is read with explicit dtypes.
+    """
+    if pyarrow is None:
+        return read_csv_typed(csv_path, columns)
+
+    # mtime은 cp -p/rsync -t로 과거 시점이 될 수 있으므로 내용 해시로 비교
+    parquet_path = columnar_path(csv_path)
+    key = source_key(csv_path)
+    if _stored_key(parquet_path) != key:
+        if not INGEST_AUTO_CONVERT:
+            return read_csv_typed(csv_path, columns)
+        with _convert_lock:
+            if _stored_key(parquet_path) != key:
+                try:
+                    convert_csv(csv_path, parquet_path, key)
+                except Exception as e:
+                    logger.error(f"Error converting {csv_path}, reading the CSV instead: {e}")
+                    return read_csv_typed(csv_path, columns)
+
+    return pd.read_parquet(parquet_path, columns=columns, memory_map=True)
+
+
+if __name__ == '__main__':
+    if pyarrow is None:
+        sys.exit("pyarrow is required to write Parquet files")
+    for path in sys.argv[1:] or list(TABLE_SCHEMAS):
+        convert_csv(path)
@@ -0,0 +1,239 @@
+# utils/job_queue.py
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Jobs and their results are kept here so they survive restarts and can be re-fetched
+JOB_DB = os.getenv("JOB_DB", "data/jobs.sqlite")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+# Finished jobs older than this are deleted
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", 7 * 24 * 3600))
+# Running jobs are marked alive this often by their process, and every process sweeps
+# for jobs without a heartbeat for JOB_STALE_SECONDS, which are assumed lost with their
+# process and requeued
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", 15))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 120))
+
+JOB_FINISHED_STATES = ('done', 'failed')
+
+
+class JobQueue:
+    """
+    Background jobs persisted in SQLite and run by a thread pool in each process.
+    Workers claim a job with an atomic status update, so a job is run once even
+    when several processes share the database. Each process refreshes updated_at of
+    the jobs it is running and, on the same tick, requeues running jobs whose heartbeat
+    stopped and resubmits queued jobs left waiting as long, so work lost with a crashed
+    process is picked up by a live one.
+    """
+
+    def __init__(self, db_path=JOB_DB, max_workers=JOB_WORKERS):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self._handlers = {}
+        self._executor = None
+        self._executor_pid = None
+        self._running = set()
+        self._lock = threading.Lock()
+        self._finished = threading.Condition()
+        self._initialized = False
+
+    def register(self, kind, handler):
+        """Registers the function run for jobs of the kind; it is called with the job params."""
+        self._handlers[kind] = handler
+
+    @contextmanager
+    def _connect(self):
+        """Yields a connection in a transaction, committed and closed on exit."""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            if not self._initialized:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, "
+                    "status TEXT NOT NULL, result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+                conn.commit()
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _pool(self):
+        with self._lock:
+            # fork 이후에는 자식 프로세스에서 스레드 풀을 새로 생성
+            if self._executor_pid == os.getpid():
+                return self._executor
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            self._executor_pid = os.getpid()
+            self._running = set()
+            threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+        self._recover()
+        return self._executor
+
+    def start(self):
+        """Starts the worker pool of this process and resumes queued jobs."""
+        self._pool()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            with self._lock:
+                running = list(self._running)
+            try:
+                if running:
+                    with self._connect() as conn:
+                        conn.executemany("UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                                         [(time.time(), job_id) for job_id in running])
+                self._sweep()
+            except sqlite3.Error as e:
+                logger.warning(f"Job heartbeat failed: {e}")
+
+    def _recover(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                         (time.time() - JOB_RESULT_TTL,))
+            queued = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")]
+        if queued:
+            logger.info(f"Resuming {len(queued)} queued jobs")
+        for job_id in queued:
+            self._executor.submit(self._run, job_id)
+        self._sweep()
+
+    def _sweep(self):
+        """
+        Requeues running jobs whose heartbeat expired and resubmits them, with queued
+        jobs left waiting as long, to this process. Returns the resubmitted job ids.
+        """
+        now = time.time()
+        cutoff = now - JOB_STALE_SECONDS
+        resubmitted = []
+        with self._connect() as conn:
+            stale = conn.execute("SELECT id, status FROM jobs WHERE status IN ('running', 'queued') AND updated_at < ?",
+                                 (cutoff,)).fetchall()
+            for job_id, status in stale:
+                # 조건부 갱신으로 다른 프로세스와 같은 작업을 중복 재제출하지 않음
+                if conn.execute("UPDATE jobs SET status = 'queued', updated_at = ? "
+                                "WHERE id = ? AND status = ? AND updated_at < ?",
+                                (now, job_id, status, cutoff)).rowcount:
+                    resubmitted.append(job_id)
+        if resubmitted:
+            logger.warning(f"Requeued {len(resubmitted)} jobs without a heartbeat for {JOB_STALE_SECONDS:g} seconds")
+        for job_id in resubmitted:
+            self._executor.submit(self._run, job_id)
+        return resubmitted
+
+    def submit(self, kind, **params):
+        """
+        Queues a job and returns its id right away.
+        Raises ValueError for a kind without a handler.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), now, now)
+            )
+        self._pool().submit(self._run, job_id)
+        return job_id
+
+    def _claim(self, job_id):
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+            if not claimed:
+                return None
+            return conn.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                         (status, result, error, time.time(), job_id))
+        with self._finished:
+            self._finished.notify_all()
+
+    def _run(self, job_id):
+        try:
+            claimed = self._claim(job_id)
+        except sqlite3.Error as e:
+            logger.error(f"Could not claim job {job_id}: {e}")
+            return
+        if claimed is None:
+            return
+
+        kind, params = claimed
+        start = time.perf_counter()
+        with self._lock:
+            self._running.add(job_id)
+        try:
+            handler = self._handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind '{kind}'")
+            result = json.dumps(handler(**json.loads(params)), ensure_ascii=False, default=str)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            self._finish(job_id, 'failed', error=str(e))
+            return
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+        self._finish(job_id, 'done', result=result)
+        logger.info(f"Job {job_id} ({kind}) finished in {time.perf_counter() - start:.2f} seconds")
+
+    def get(self, job_id):
+        """
+        Returns the job (id, kind, params, status, result, error, timestamps), or None.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, params, status, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'kind': row[1],
+            'params': json.loads(row[2]),
+            'status': row[3],
+            'result': json.loads(row[4]) if row[4] is not None else None,
+            'error': row[5],
+            'created_at': row[6],
+            'updated_at': row[7],
+        }
+
+    def wait(self, job_id, timeout):
+        """
+        Returns the job once it has finished or the timeout (seconds) has passed.
+        Jobs finished by this process wake the waiter at once; others are seen by polling.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in JOB_FINISHED_STATES or remaining <= 0:
+                return job
+            with self._finished:
+                self._finished.wait(min(remaining, 0.5))
+
+
+job_queue = JobQueue()
@@ -0,0 +1,97 @@
+# utils/json_stream.py
+
+import json
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JSONObjectStream:
+    """
+    Incremental parser that pulls top-level JSON objects out of streamed text.
+    Text is fed in arbitrary pieces; each object is returned as soon as its closing
+    brace arrives. Anything between objects (commas, brackets, prose) is kept in
+    `outside` so callers can detect sentinel answers.
+    """
+
+    def __init__(self):
+        self.outside = []
+        self.errors = []
+        self._reset()
+
+    def _reset(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Consumes a piece of text and returns the objects completed by it."""
+        objects = []
+        pending = [text]
+        while pending:
+            chunk = pending.pop()
+            for position, char in enumerate(chunk):
+                if self._depth == 0:
+                    if char == '{':
+                        self._depth = 1
+                        self._buffer = [char]
+                    else:
+                        self.outside.append(char)
+                    continue
+
+                self._buffer.append(char)
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif char == '\\':
+                        self._escape = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char == '{':
+                    self._depth += 1
+                elif char == '}':
+                    self._depth -= 1
+                    if self._depth == 0:
+                        raw = ''.join(self._buffer)
+                        self._buffer = []
+                        parsed = self._parse(raw)
+                        if parsed is not None:
+                            objects.append(parsed)
+                            continue
+                        # 잘못된 객체의 시작 다음부터 다시 스캔해 그 안에 섞인 정상 객체를 살림
+                        pending.append(chunk[position + 1:])
+                        pending.append(raw[1:])
+                        break
+        return objects
+
+    def _parse(self, raw):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed JSON object: {e}")
+            self.errors.append(raw)
+            return None
+
+    def close(self):
+        """
+        Records an unterminated trailing object as an error and returns the complete
+        objects found after its opening brace (an object missing its closing brace
+        would otherwise swallow every object after it).
+        """
+        objects = []
+        while self._depth:
+            raw = ''.join(self._buffer)
+            logger.warning("Skipping unterminated JSON object")
+            self.errors.append(raw)
+            self._reset()
+            objects.extend(self.feed(raw[1:]))
+        return objects
+
+    @property
+    def outside_text(self):
+        return ''.join(self.outside).strip()
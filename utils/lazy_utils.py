@@ -0,0 +1,101 @@
+# utils/lazy_utils.py
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load the registered resources in a background thread when the app starts
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "1") == "1"
+
+_resources = OrderedDict()
+_warm_up_pid = None
+_warm_up_lock = threading.Lock()
+
+
+class LazyResource:
+    """
+    A heavy object (model, index, dataset) built by loader on first get(), once per
+    process. Concurrent callers wait for the same load. Registered resources are
+    loaded by the warm-up thread, lowest priority first, and reported by readiness().
+    """
+
+    def __init__(self, name, loader, priority=100):
+        self.name = name
+        self.priority = priority
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.state = 'pending'
+        self.error = None
+        self.load_seconds = None
+        _resources[name] = self
+
+    def get(self):
+        """
+        Returns the resource, loading it first if needed.
+        Raises the loader's exception when loading fails; the next call retries.
+        """
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                self.state = 'loading'
+                start = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    self.state, self.error = 'failed', str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.state, self.error = 'ready', None
+                self._loaded = True
+                logger.info(f"Loaded {self.name} in {self.load_seconds:.2f} seconds")
+        return self._value
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+
+def warm_up(names=None):
+    """
+    Loads the registered resources (or the named ones) by priority.
+    Failures are logged and left for the first request to retry.
+    """
+    for name, resource in sorted(_resources.items(), key=lambda item: item[1].priority):
+        if names is not None and name not in names:
+            continue
+        try:
+            resource.get()
+        except Exception as e:
+            logger.error(f"Error warming up {name}: {e}")
+
+
+def start_warm_up(names=None):
+    """
+    Starts warm_up in a daemon thread, once per process.
+    """
+    global _warm_up_pid
+    with _warm_up_lock:
+        if _warm_up_pid == os.getpid():
+            return
+        _warm_up_pid = os.getpid()
+    threading.Thread(target=warm_up, args=(names,), name='warm-up', daemon=True).start()
+
+
+def readiness():
+    """
+    Returns whether every registered resource is loaded, with the state and load time of each.
+    """
+    resources = {
+        name: {'state': resource.state, 'load_seconds': resource.load_seconds, 'error': resource.error}
+        for name, resource in _resources.items()
+    }
+    return {'ready': all(resource.loaded for resource in _resources.values()), 'resources': resources}
@@ -0,0 +1,134 @@
+# utils/llm_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+# Completions sampled above this temperature are not cached
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.2))
+# Optional on-disk tier, e.g. data/llm_cache.sqlite (disabled when unset)
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB")
+
+
+def completion_key(model, messages, temperature):
+    """
+    Returns the fingerprint of a chat completion request.
+    """
+    payload = json.dumps({'model': model, 'messages': messages, 'temperature': temperature},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """
+    Two-tier completion cache: an in-process LRU with TTL in front of an optional
+    SQLite table shared by all worker processes.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL, db_path=LLM_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS completions "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        """Yields a connection in a transaction, committed and closed on exit."""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self._counters[name] += 1
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Returns the cached completion for the key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                self._counters['memory_hits'] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM completions WHERE key = ? AND expires_at > ?",
+                        (key, now)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Completion cache read failed: {e}")
+                row = None
+            if row:
+                self._remember(key, row[0], row[1])
+                self._count('hits', 'disk_hits')
+                return row[0]
+
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        """Stores a completion in both tiers."""
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+                    conn.execute("DELETE FROM completions WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error as e:
+                logger.warning(f"Completion cache write failed: {e}")
+
+    def stats(self):
+        """Returns hit/miss counters and the in-process size."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+completion_cache = CompletionCache()
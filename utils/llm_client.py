@@ -0,0 +1,243 @@
+# utils/llm_client.py
+
+import os
+import time
+import queue
+import random
+import asyncio
+import logging
+import threading
+import openai
+from utils.prompt_budget import count_message_tokens
+from utils.llm_cache import LLM_CACHE_MAX_TEMPERATURE, completion_cache, completion_key
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 200))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 40000))
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", 4))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 30))
+# Completion tokens reserved against the token budget when max_tokens is not given
+LLM_DEFAULT_COMPLETION_TOKENS = int(os.getenv("LLM_DEFAULT_COMPLETION_TOKENS", 1024))
+
+# Errors worth retrying after a backoff; anything else fails immediately
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+)
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket refilled continuously at rate_per_minute.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        # 한 번에 버킷 용량을 넘는 요청은 용량만큼만 대기
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class LLMClient:
+    """
+    Single entry point for chat completions.
+    All calls run on one background event loop per process, so the request and
+    token budgets and the per-model concurrency caps are shared by every request.
+    Rate-limit waits and retry backoff are asyncio sleeps, not blocking sleeps, and
+    blocking work (cache I/O, token counting) runs in the loop's thread pool.
+    """
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_concurrency_per_model=LLM_MAX_CONCURRENCY_PER_MODEL, backoff_max=LLM_BACKOFF_MAX):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.backoff_max = backoff_max
+        self._loop = None
+        self._loop_pid = None
+        self._loop_lock = threading.Lock()
+        self._reset_limits()
+
+    def _reset_limits(self):
+        self._request_bucket = TokenBucket(self.requests_per_minute)
+        self._token_bucket = TokenBucket(self.tokens_per_minute)
+        self._semaphores = {}
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            # 프로세스 fork 이후에는 이벤트 루프 스레드를 새로 시작
+            if self._loop is None or self._loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='llm-client', daemon=True).start()
+                self._loop = loop
+                self._loop_pid = os.getpid()
+                self._reset_limits()
+            return self._loop
+
+    def _semaphore(self, model):
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        return self._semaphores[model]
+
+    def _backoff(self, attempt, backoff_factor):
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, backoff_factor ** attempt))
+
+    @staticmethod
+    async def _blocking(func, *args):
+        # SQLite 캐시 조회나 토크나이저 로드가 공유 이벤트 루프를 막지 않도록 스레드에서 실행
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _acquire(self, prompt_tokens, max_tokens):
+        await self._request_bucket.acquire(1)
+        await self._token_bucket.acquire(prompt_tokens + (max_tokens or LLM_DEFAULT_COMPLETION_TOKENS))
+
+    async def achat(self, model, messages, temperature=0, max_tokens=None, max_retries=3, backoff_factor=2):
+        """
+        Returns the completion text for the messages.
+        Low-temperature completions are served from the completion cache when possible.
+        Raises the last OpenAI error when all retries fail.
+        """
+        cacheable = temperature <= LLM_CACHE_MAX_TEMPERATURE
+        if cacheable:
+            key = completion_key(model, messages, temperature)
+            cached = await self._blocking(completion_cache.get, key)
+            if cached is not None:
+                logger.info(f"Completion cache hit for {model}")
+                return cached
+
+        prompt_tokens = await self._blocking(count_message_tokens, messages, model)
+        for attempt in range(max_retries):
+            await self._acquire(prompt_tokens, max_tokens)
+            try:
+                async with self._semaphore(model):
+                    response = await openai.ChatCompletion.acreate(
+                        model=model,
+                        messages=messages,
+                        n=1,
+                        stop=None,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+            except RETRYABLE_ERRORS as e:
+                if attempt + 1 >= max_retries:
+                    raise
+                sleep_time = self._backoff(attempt + 1, backoff_factor)
+                logger.warning(f"{type(e).__name__} from {model}: {e}. Attempt {attempt + 1} of {max_retries}, "
+                               f"retrying in {sleep_time:.1f} seconds")
+                await asyncio.sleep(sleep_time)
+                continue
+
+            answer = response['choices'][0]['message']['content'].strip()
+            if cacheable:
+                await self._blocking(completion_cache.set, key, answer)
+            return answer
+
+    async def astream(self, model, messages, temperature=0, max_tokens=None, max_retries=3, backoff_factor=2):
+        """
+        Yields the completion text piece by piece as the model generates it.
+        Retries only happen before the first piece is yielded. A cached completion
+        is yielded as a single piece, and a finished stream is added to the cache.
+        """
+        cacheable = temperature <= LLM_CACHE_MAX_TEMPERATURE
+        if cacheable:
+            key = completion_key(model, messages, temperature)
+            cached = await self._blocking(completion_cache.get, key)
+            if cached is not None:
+                logger.info(f"Completion cache hit for {model}")
+                yield cached
+                return
+
+        prompt_tokens = await self._blocking(count_message_tokens, messages, model)
+        for attempt in range(max_retries):
+            await self._acquire(prompt_tokens, max_tokens)
+            pieces = []
+            try:
+                async with self._semaphore(model):
+                    response = await openai.ChatCompletion.acreate(
+                        model=model,
+                        messages=messages,
+                        n=1,
+                        stop=None,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True
+                    )
+                    async for chunk in response:
+                        piece = chunk['choices'][0]['delta'].get('content')
+                        if piece:
+                            pieces.append(piece)
+                            yield piece
+            except RETRYABLE_ERRORS as e:
+                if pieces or attempt + 1 >= max_retries:
+                    raise
+                sleep_time = self._backoff(attempt + 1, backoff_factor)
+                logger.warning(f"{type(e).__name__} from {model}: {e}. Attempt {attempt + 1} of {max_retries}, "
+                               f"retrying in {sleep_time:.1f} seconds")
+                await asyncio.sleep(sleep_time)
+                continue
+
+            if cacheable:
+                await self._blocking(completion_cache.set, key, ''.join(pieces).strip())
+            return
+
+    def stream(self, model, messages, temperature=0, **kwargs):
+        """
+        Blocking generator around astream for synchronous callers.
+        Closing the generator early cancels the underlying request.
+        """
+        pieces = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for piece in self.astream(model, messages, temperature=temperature, **kwargs):
+                    pieces.put(piece)
+            except Exception as e:
+                pieces.put(e)
+            finally:
+                pieces.put(finished)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._ensure_loop())
+        try:
+            while True:
+                piece = pieces.get()
+                if piece is finished:
+                    return
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        finally:
+            future.cancel()
+
+    def chat(self, model, messages, temperature=0, **kwargs):
+        """
+        Blocking wrapper around achat for synchronous callers such as Flask views.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.achat(model, messages, temperature=temperature, **kwargs), self._ensure_loop()
+        )
+        return future.result()
+
+
+llm_client = LLMClient()
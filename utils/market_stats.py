@@ -0,0 +1,151 @@
+# utils/market_stats.py
+
+import logging
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MARKET_PERCENTILES = (10, 25, 50, 75, 90)
+
+_MARKET_COLUMNS = ['종목명', '산업군', '시가총액 (₩)']
+_QUARTERLY_COLUMNS = ['종목명', '대주주 지분율(%)']
+
+
+def _row_keys(frame):
+    # 행 전체 해시에 같은 행의 등장 순번을 섞어 중복 행도 하나씩 구분
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy().astype(np.uint64)
+    return hashes ^ (occurrence * np.uint64(0x9E3779B97F4A7C15))
+
+
+def changed_rows(old, new):
+    """
+    Returns (removed, added): rows only in old and rows only in new, comparing whole
+    rows by hash, so a changed row shows up in both. Duplicate rows are matched one to one.
+    """
+    old_keys, new_keys = _row_keys(old), _row_keys(new)
+    return old[~np.isin(old_keys, new_keys)], new[~np.isin(new_keys, old_keys)]
+
+
+class MarketStatistics:
+    """
+    Market aggregates kept as running sums and counts.
+    The first version is built from every row; the next data version is derived with
+    updated(), which only adds and subtracts the rows that were added, removed or
+    changed. Percentiles are recomputed from the new column. overview() serves the
+    precomputed result.
+    """
+
+    def __init__(self, df_market, df_quarterly, totals=None):
+        self._source_market, self._source_quarterly = df_market, df_quarterly
+        self._market = df_market[_MARKET_COLUMNS]
+        self._quarterly = df_quarterly[_QUARTERLY_COLUMNS]
+
+        if totals is None:
+            totals = self._empty_totals()
+            self._apply_market(totals, self._market, 1)
+            self._apply_quarterly(totals, self._quarterly, 1)
+        self._totals = totals
+        self._overview = self._build_overview()
+
+    @staticmethod
+    def _empty_totals():
+        return {
+            'companies': 0,
+            'market_cap_sum': 0.0,
+            'market_cap_count': 0,
+            'shareholder_ratio_sum': 0.0,
+            'shareholder_ratio_count': 0,
+            'industry_companies': defaultdict(int),
+            'industry_market_cap_sum': defaultdict(float),
+            'industry_market_cap_count': defaultdict(int),
+        }
+
+    @staticmethod
+    def _apply_market(totals, rows, sign):
+        caps = rows['시가총액 (₩)']
+        totals['companies'] += sign * len(rows)
+        totals['market_cap_sum'] += sign * float(caps.sum())
+        totals['market_cap_count'] += sign * int(caps.count())
+
+        by_industry = rows.groupby(rows['산업군'].astype(object).fillna('기타'))['시가총액 (₩)'].agg(['size', 'sum', 'count'])
+        for industry, (size, total, count) in by_industry.iterrows():
+            totals['industry_companies'][industry] += sign * int(size)
+            totals['industry_market_cap_sum'][industry] += sign * float(total)
+            totals['industry_market_cap_count'][industry] += sign * int(count)
+
+    @staticmethod
+    def _apply_quarterly(totals, rows, sign):
+        ratios = rows['대주주 지분율(%)']
+        totals['shareholder_ratio_sum'] += sign * float(ratios.sum())
+        totals['shareholder_ratio_count'] += sign * int(ratios.count())
+
+    def updated(self, df_market, df_quarterly):
+        """
+        Returns the statistics for new market and quarterly frames, applying only the
+        rows that differ from this version.
+        """
+        totals = dict(self._totals)
+        totals['industry_companies'] = defaultdict(int, totals['industry_companies'])
+        totals['industry_market_cap_sum'] = defaultdict(float, totals['industry_market_cap_sum'])
+        totals['industry_market_cap_count'] = defaultdict(int, totals['industry_market_cap_count'])
+
+        if df_market is not self._source_market:
+            removed, added = changed_rows(self._market, df_market[_MARKET_COLUMNS])
+            self._apply_market(totals, removed, -1)
+            self._apply_market(totals, added, 1)
+            logger.info(f"Market statistics: {len(removed)} market rows removed, {len(added)} added")
+
+        if df_quarterly is not self._source_quarterly:
+            removed, added = changed_rows(self._quarterly, df_quarterly[_QUARTERLY_COLUMNS])
+            self._apply_quarterly(totals, removed, -1)
+            self._apply_quarterly(totals, added, 1)
+
+        return MarketStatistics(df_market, df_quarterly, totals)
+
+    @staticmethod
+    def _percentiles(values):
+        values = values.to_numpy(dtype=float, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return {}
+        return {f"p{q}": float(v) for q, v in zip(MARKET_PERCENTILES, np.percentile(values, MARKET_PERCENTILES))}
+
+    def _build_overview(self):
+        totals = self._totals
+        total_market_cap = totals['market_cap_sum']
+
+        industries = {}
+        for industry, companies in sorted(totals['industry_companies'].items()):
+            if companies <= 0:
+                continue
+            industry_cap = totals['industry_market_cap_sum'][industry]
+            # 시가총액이 없는 기업은 평균에서 제외
+            cap_count = totals['industry_market_cap_count'][industry]
+            industries[industry] = {
+                'num_companies': companies,
+                'total_market_cap': industry_cap,
+                'avg_market_cap': industry_cap / cap_count if cap_count else None,
+                'market_cap_share': industry_cap / total_market_cap if total_market_cap else 0.0,
+            }
+
+        return {
+            'total_market_cap': total_market_cap,
+            'avg_market_cap': total_market_cap / totals['market_cap_count'] if totals['market_cap_count'] else None,
+            'avg_shareholder_ratio': (totals['shareholder_ratio_sum'] / totals['shareholder_ratio_count']
+                                      if totals['shareholder_ratio_count'] else None),
+            'num_companies': totals['companies'],
+            'industries': industries,
+            'market_cap_percentiles': self._percentiles(self._market['시가총액 (₩)']),
+            'shareholder_ratio_percentiles': self._percentiles(self._quarterly['대주주 지분율(%)']),
+        }
+
+    def overview(self):
+        """
+        Returns the precomputed market overview (shared, do not modify).
+        """
+        return self._overview
@@ -0,0 +1,151 @@
+# utils/maturity_calendar.py
+
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Calendar event -> bond date column
+CALENDAR_EVENTS = {
+    'maturity': '기발행사채만기일',
+    'put': '풋옵션최초도래일',
+    'call': '콜옵션최초도래일',
+}
+
+# Bin size in months
+CALENDAR_FREQUENCIES = {'month': 1, 'quarter': 3}
+
+
+def _bin_label(key, step):
+    year, month = divmod(int(key) * step, 12)
+    if step == 3:
+        return f"{1970 + year}Q{month // 3 + 1}"
+    return f"{1970 + year}-{month + 1:02d}"
+
+
+class EventSchedule:
+    """
+    Bond dates of one event type sorted once, with a cumulative amount column, so the
+    bonds and total amount falling in any date window come from two binary searches.
+    Calendar bins with running totals start at the as-of date, so dates already
+    passed are left out; they are computed once per as-of date and kept for the
+    most recent one.
+    """
+
+    def __init__(self, dates, amounts, issuers):
+        valid = ~np.isnat(dates)
+        order = np.argsort(dates[valid], kind='stable')
+        self.dates = dates[valid][order]
+        self.amounts = amounts[valid][order]
+        self.issuers = issuers[valid][order]
+        self.cumulative_amount = np.concatenate([[0.0], np.cumsum(self.amounts)])
+        self._cached_as_of = None
+        self._cached_bins = None
+        self._lock = threading.Lock()
+
+    def _bins(self, first, step):
+        dates, amounts = self.dates[first:], self.amounts[first:]
+        if not len(dates):
+            return {'bins': [], 'bonds': [], 'amount': [], 'cumulative_bonds': [], 'cumulative_amount': []}
+        # 1970-01부터의 개월 수를 step으로 나눠 월/분기 구간 번호로 사용
+        keys = dates.astype('datetime64[M]').astype(np.int64) // step
+        offsets = keys - keys[0]
+        bonds = np.bincount(offsets)
+        amount = np.bincount(offsets, weights=amounts)
+        return {
+            'bins': [_bin_label(key, step) for key in range(keys[0], keys[-1] + 1)],
+            'bonds': bonds.tolist(),
+            'amount': amount.tolist(),
+            'cumulative_bonds': np.cumsum(bonds).tolist(),
+            'cumulative_amount': np.cumsum(amount).tolist(),
+        }
+
+    def bins(self, as_of):
+        """Returns the calendar bins of every frequency for the dates from as_of on."""
+        with self._lock:
+            if self._cached_as_of == as_of:
+                return self._cached_bins
+        first = int(np.searchsorted(self.dates, np.datetime64(as_of, 'ns'), side='left'))
+        bins = {freq: self._bins(first, step) for freq, step in CALENDAR_FREQUENCIES.items()}
+        with self._lock:
+            self._cached_as_of, self._cached_bins = as_of, bins
+        return bins
+
+    def window(self, start, end):
+        """Returns the (first, last + 1) positions of the dates in [start, end)."""
+        return (int(np.searchsorted(self.dates, np.datetime64(start, 'ns'), side='left')),
+                int(np.searchsorted(self.dates, np.datetime64(end, 'ns'), side='left')))
+
+    def total(self, start, end):
+        """Returns (bonds, amount) falling in [start, end)."""
+        first, last = self.window(start, end)
+        return last - first, float(self.cumulative_amount[last] - self.cumulative_amount[first])
+
+
+class MaturityCalendar:
+    """
+    Maturity, put and call calendars of all bonds, built in one vectorized pass per
+    event type.
+    """
+
+    def __init__(self, df_bonds):
+        amounts = df_bonds['총발행금액 (₩)'].to_numpy(dtype=float, na_value=0.0)
+        issuers = df_bonds['종목명'].astype(object).to_numpy()
+        self.schedules = {
+            event: EventSchedule(pd.to_datetime(df_bonds[column], errors='coerce').to_numpy('datetime64[ns]'),
+                                 amounts, issuers)
+            for event, column in CALENDAR_EVENTS.items()
+        }
+
+    def _schedule(self, event):
+        if event not in self.schedules:
+            raise ValueError(f"Unknown event '{event}', expected one of {', '.join(self.schedules)}")
+        return self.schedules[event]
+
+    def calendar(self, event='maturity', freq='month', as_of=None):
+        """
+        Returns the bins of the event calendar from as_of (default today) on, so only
+        outstanding bonds are counted (shared, do not modify).
+        """
+        if freq not in CALENDAR_FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{freq}', expected one of {', '.join(CALENDAR_FREQUENCIES)}")
+        start = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+        return self._schedule(event).bins(start)[freq]
+
+    def due_within(self, months, event='maturity', as_of=None):
+        """
+        Returns the bonds whose event date falls within the next months from as_of
+        (default today): totals and the issuers involved, largest amount first.
+        """
+        if months < 0:
+            raise ValueError("months must not be negative")
+        schedule = self._schedule(event)
+        start = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+        end = start + pd.DateOffset(months=months)
+        first, last = schedule.window(start, end)
+        bonds, amount = schedule.total(start, end)
+
+        due = pd.DataFrame({
+            'issuer': schedule.issuers[first:last],
+            'amount': schedule.amounts[first:last],
+            'date': schedule.dates[first:last],
+        })
+        by_issuer = (due.groupby('issuer', sort=False)
+                     .agg(amount=('amount', 'sum'), bonds=('amount', 'size'), first_date=('date', 'min'))
+                     .sort_values('amount', ascending=False))
+        return {
+            'event': event,
+            'from': start.strftime('%Y-%m-%d'),
+            'to': end.strftime('%Y-%m-%d'),
+            'bonds': bonds,
+            'amount': amount,
+            'issuers': [
+                {'issuer': issuer, 'amount': float(row['amount']), 'bonds': int(row['bonds']),
+                 'first_date': row['first_date'].strftime('%Y-%m-%d')}
+                for issuer, row in by_issuer.iterrows()
+            ],
+        }
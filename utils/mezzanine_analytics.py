@@ -0,0 +1,228 @@
+# utils/mezzanine_analytics.py
+
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from utils.market_stats import changed_rows
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Coupon histogram bins in percentage points; the last bin is open-ended
+COUPON_BIN_WIDTH = 0.5
+COUPON_BIN_COUNT = 20
+
+_BOND_COLUMNS = ['종목명', '회차', '총발행금액 (₩)', '발행일', '표면이자율 (%)', '만기이자율 (%)',
+                 '리픽싱비율 (%)', '풋옵션최초도래일', '기발행사채만기일']
+_HISTOGRAM_COLUMNS = [f"{i * COUPON_BIN_WIDTH:g}%~" for i in range(COUPON_BIN_COUNT)]
+
+
+def _aggregate(rows, keys):
+    """
+    Sums the decomposable statistics of the rows per key in one groupby pass:
+    issue count, amount, coupon sum and sum of squares, and the coupon histogram.
+    """
+    coupon = rows['표면이자율 (%)'].to_numpy(dtype=float, na_value=np.nan)
+    has_coupon = ~np.isnan(coupon)
+    coupon_bins = np.clip((np.nan_to_num(coupon) // COUPON_BIN_WIDTH).astype(int), 0, COUPON_BIN_COUNT - 1)
+
+    histogram = np.zeros((len(rows), COUPON_BIN_COUNT))
+    histogram[np.flatnonzero(has_coupon), coupon_bins[has_coupon]] = 1
+
+    frame = pd.DataFrame(histogram, columns=_HISTOGRAM_COLUMNS)
+    frame.insert(0, 'issues', 1.0)
+    frame.insert(1, 'amount', rows['총발행금액 (₩)'].to_numpy(dtype=float, na_value=0.0))
+    frame.insert(2, 'coupon_count', has_coupon.astype(float))
+    frame.insert(3, 'coupon_sum', np.nan_to_num(coupon))
+    frame.insert(4, 'coupon_sq_sum', np.nan_to_num(coupon) ** 2)
+    return frame.groupby(np.asarray(keys), dropna=False).sum()
+
+
+def _month_keys(rows):
+    # 문자열 포맷 대신 월 단위 datetime64로 묶고, 레이블은 집계 후 변환
+    return pd.to_datetime(rows['발행일'], errors='coerce').to_numpy('datetime64[ns]').astype('datetime64[M]')
+
+
+def _issuer_keys(rows):
+    return rows['종목명'].astype(object).fillna('unknown')
+
+
+def _combine(table, removed, added):
+    table = table.sub(removed, fill_value=0).add(added, fill_value=0)
+    return table[table['issues'] > 0].sort_index()
+
+
+def _summaries(table, key_name):
+    coupon_count = table['coupon_count'].replace(0, np.nan)
+    avg_coupon = table['coupon_sum'] / coupon_count
+    coupon_std = np.sqrt(np.maximum(table['coupon_sq_sum'] / coupon_count - avg_coupon ** 2, 0))
+    keys = table.index.to_numpy()
+    if np.issubdtype(keys.dtype, np.datetime64):
+        keys = np.where(np.isnat(keys), 'unknown', np.datetime_as_string(keys, unit='M'))
+    summaries = pd.DataFrame({
+        key_name: keys,
+        'issues': table['issues'].astype(int).to_numpy(),
+        'total_amount': table['amount'].to_numpy(),
+        'avg_amount': (table['amount'] / table['issues']).to_numpy(),
+        'avg_coupon': avg_coupon.to_numpy(),
+        'coupon_std': coupon_std.to_numpy(),
+    })
+    records = summaries.astype(object).where(summaries.notna(), None).to_dict('records')
+    histograms = table[_HISTOGRAM_COLUMNS].astype(int).to_dict('records')
+    for record, histogram in zip(records, histograms):
+        record['coupon_histogram'] = {label: count for label, count in histogram.items() if count}
+    return records
+
+
+def redemption_values(bonds):
+    """
+    Estimated put redemption value per 100 of principal: principal accreted at the
+    만기이자율 from 발행일 to 풋옵션최초도래일, less the 표면이자율 coupons already paid
+    (annual compounding), as in the usual Korean CB/BW guaranteed-yield terms.
+    """
+    years = (pd.to_datetime(bonds['풋옵션최초도래일'], errors='coerce')
+             - pd.to_datetime(bonds['발행일'], errors='coerce')).dt.days.to_numpy(dtype=float, na_value=np.nan) / 365.0
+    guaranteed = bonds['만기이자율 (%)'].to_numpy(dtype=float, na_value=np.nan) / 100
+    coupon = bonds['표면이자율 (%)'].to_numpy(dtype=float, na_value=np.nan)
+
+    growth = (1 + guaranteed) ** years
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coupons_value = np.where(guaranteed > 0, coupon * (growth - 1) / guaranteed, coupon * years)
+    return 100 * growth - coupons_value
+
+
+def yield_to_put(bonds, redemption, as_of, price=100.0):
+    """
+    Approximate annual yield to the first put date, in percent, for a holder buying
+    at price on as_of: (coupon + (redemption - price) / years) / ((redemption + price) / 2).
+    NaN when the put date has passed or is unknown.
+    """
+    years = (pd.to_datetime(bonds['풋옵션최초도래일'], errors='coerce')
+             - pd.Timestamp(as_of)).dt.days.to_numpy(dtype=float, na_value=np.nan) / 365.0
+    coupon = bonds['표면이자율 (%)'].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ytp = (coupon + (redemption - price) / years) / ((redemption + price) / 2) * 100
+    return np.where(years > 0, ytp, np.nan)
+
+
+class MezzanineAnalytics:
+    """
+    Issuance analytics over the mezzanine bond filings.
+    Monthly and per-issuer volume and coupon statistics are kept as decomposable
+    sums (counts, amounts, coupon sums and a coupon histogram), so updated() only
+    aggregates the filings that were added, removed or changed. Put redemption values
+    are estimated once per version; yields to put depend on the date and are computed
+    vectorized per as-of date and kept for the most recent one.
+    """
+
+    def __init__(self, df_bonds, tables=None):
+        self._source = df_bonds
+        self._bonds = df_bonds[_BOND_COLUMNS]
+
+        if tables is None:
+            tables = (_aggregate(self._bonds, _month_keys(self._bonds)),
+                      _aggregate(self._bonds, _issuer_keys(self._bonds)))
+        self.monthly_table, self.issuer_table = tables
+
+        self.monthly = _summaries(self.monthly_table, 'month')
+        self.by_issuer = sorted(_summaries(self.issuer_table, 'issuer'), key=lambda row: -row['total_amount'])
+        self.redemption = redemption_values(self._bonds)
+        self.redemption.flags.writeable = False
+
+        self._cached_as_of = None
+        self._cached_analysis = None
+        self._lock = threading.Lock()
+
+    def updated(self, df_bonds):
+        """
+        Returns the analytics for a new bonds frame, aggregating only the changed filings.
+        """
+        removed, added = changed_rows(self._bonds, df_bonds[_BOND_COLUMNS])
+        monthly = _combine(self.monthly_table, _aggregate(removed, _month_keys(removed)),
+                           _aggregate(added, _month_keys(added)))
+        by_issuer = _combine(self.issuer_table, _aggregate(removed, _issuer_keys(removed)),
+                             _aggregate(added, _issuer_keys(added)))
+        logger.info(f"Mezzanine analytics: {len(removed)} filings removed, {len(added)} added")
+        return MezzanineAnalytics(df_bonds, (monthly, by_issuer))
+
+    def refixing_exposure(self, as_of, top=10):
+        """
+        Summarizes the outstanding bonds (기발행사채만기일 after as_of) that carry a
+        refixing clause, overall and by issuer.
+        """
+        bonds = self._bonds
+        ratio = bonds['리픽싱비율 (%)'].to_numpy(dtype=float, na_value=np.nan)
+        amount = bonds['총발행금액 (₩)'].to_numpy(dtype=float, na_value=0.0)
+        outstanding = (pd.to_datetime(bonds['기발행사채만기일'], errors='coerce') > pd.Timestamp(as_of)).to_numpy()
+        exposed = outstanding & (np.nan_to_num(ratio) > 0)
+
+        exposed_amount = amount[exposed]
+        by_issuer = (pd.DataFrame({'issuer': _issuer_keys(bonds)[exposed].to_numpy(), 'amount': exposed_amount,
+                                   'weighted_ratio': exposed_amount * ratio[exposed]})
+                     .groupby('issuer').sum()
+                     .nlargest(top, 'amount'))
+        return {
+            'outstanding_bonds': int(outstanding.sum()),
+            'bonds_with_refixing': int(exposed.sum()),
+            'refixable_amount': float(exposed_amount.sum()),
+            'refixable_share': float(exposed_amount.sum() / amount[outstanding].sum()) if outstanding.any() else 0.0,
+            'avg_refixing_ratio': (float((exposed_amount * ratio[exposed]).sum() / exposed_amount.sum())
+                                   if exposed_amount.sum() else None),
+            'top_issuers': [
+                {'issuer': issuer, 'refixable_amount': row['amount'],
+                 'avg_refixing_ratio': row['weighted_ratio'] / row['amount']}
+                for issuer, row in by_issuer.iterrows()
+            ],
+        }
+
+    def _yield_to_put_records(self, as_of, top=20):
+        ytp = yield_to_put(self._bonds, self.redemption, as_of)
+        valid = np.flatnonzero(~np.isnan(ytp))
+        rows = valid[np.argsort(-ytp[valid], kind='stable')[:top]]
+        bonds = self._bonds.iloc[rows]
+        frame = pd.DataFrame({
+            '종목명': bonds['종목명'].astype(object).to_numpy(),
+            '회차': bonds['회차'].to_numpy(),
+            '풋옵션최초도래일': pd.to_datetime(bonds['풋옵션최초도래일'], errors='coerce').dt.strftime('%Y-%m-%d').to_numpy(),
+            '만기이자율 (%)': bonds['만기이자율 (%)'].to_numpy(),
+            'put_redemption_value': self.redemption[rows],
+            'yield_to_put (%)': ytp[rows],
+        })
+        summary = {
+            'bonds': int(len(valid)),
+            'avg_yield_to_put': float(ytp[valid].mean()) if len(valid) else None,
+            'median_yield_to_put': float(np.median(ytp[valid])) if len(valid) else None,
+        }
+        return summary, frame.to_dict('records')
+
+    def analysis(self, as_of=None):
+        """
+        Returns the full analysis as of a date (default today). Computed once per date.
+        """
+        as_of = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+        with self._lock:
+            if self._cached_as_of == as_of:
+                return self._cached_analysis
+
+        totals = self.monthly_table[['issues', 'amount', 'coupon_count', 'coupon_sum']].sum()
+        issue_dates = pd.to_datetime(self._source['발행일'], errors='coerce')
+        recent = self._source.loc[issue_dates.nlargest(5).index]
+        ytp_summary, ytp_top = self._yield_to_put_records(as_of)
+        analysis = {
+            'total_issues': int(totals['issues']),
+            'avg_amount': totals['amount'] / totals['issues'] if totals['issues'] else None,
+            'avg_interest_rate': totals['coupon_sum'] / totals['coupon_count'] if totals['coupon_count'] else None,
+            'most_common_issuer': self.issuer_table['issues'].idxmax() if len(self.issuer_table) else None,
+            'recent_issues': recent.astype(object).where(recent.notna(), None).to_dict('records'),
+            'monthly': self.monthly,
+            'by_issuer': self.by_issuer,
+            'yield_to_put': ytp_summary,
+            'highest_yield_to_put': ytp_top,
+            'refixing_exposure': self.refixing_exposure(as_of),
+        }
+
+        with self._lock:
+            self._cached_as_of, self._cached_analysis = as_of, analysis
+        return analysis
@@ -0,0 +1,140 @@
+# utils/prompt_budget.py
+
+import os
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Context window (prompt + completion tokens) per model
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+    'gpt-3.5-turbo': 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens kept free for the completion
+PROMPT_COMPLETION_RESERVE = int(os.getenv("PROMPT_COMPLETION_RESERVE", 1024))
+
+# Per-message formatting overhead of the chat format
+_TOKENS_PER_MESSAGE = 4
+
+_tokenizers = {}
+_tokenizer_lock = threading.Lock()
+
+
+class _HeuristicTokenizer:
+    """Fallback when no tokenizer library is installed (about 4 characters per token)."""
+
+    def encode(self, text):
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def decode(self, tokens):
+        return ''.join(tokens)
+
+
+class _HFTokenizer:
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def encode(self, text):
+        return self._tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, tokens):
+        return self._tokenizer.decode(tokens, clean_up_tokenization_spaces=True)
+
+
+def _load_tokenizer(model):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except ImportError:
+        pass
+
+    try:
+        from transformers import GPT2TokenizerFast
+        return _HFTokenizer(GPT2TokenizerFast.from_pretrained('gpt2'))
+    except Exception as e:
+        logger.warning(f"No tokenizer available, estimating token counts: {e}")
+        return _HeuristicTokenizer()
+
+
+def get_tokenizer(model='gpt-4'):
+    """
+    Returns the tokenizer for the model, loaded once per process.
+    Uses tiktoken when installed, then a fast GPT-2 tokenizer, then a character estimate.
+    """
+    tokenizer = _tokenizers.get(model)
+    if tokenizer is None:
+        with _tokenizer_lock:
+            tokenizer = _tokenizers.get(model)
+            if tokenizer is None:
+                tokenizer = _tokenizers[model] = _load_tokenizer(model)
+    return tokenizer
+
+
+def count_tokens(text, model='gpt-4'):
+    """
+    Returns the number of tokens in the text for the model.
+    """
+    return len(get_tokenizer(model).encode(text)) if text else 0
+
+
+def count_message_tokens(messages, model='gpt-4'):
+    """
+    Returns the prompt token count of chat messages.
+    """
+    return sum(count_tokens(message['content'], model) + _TOKENS_PER_MESSAGE for message in messages)
+
+
+def truncate_to_tokens(text, max_tokens, model='gpt-4'):
+    """
+    Truncates the text to at most max_tokens tokens.
+    """
+    tokenizer = get_tokenizer(model)
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return tokenizer.decode(tokens[:max(max_tokens, 0)])
+
+
+def prompt_budget(model, completion_tokens=PROMPT_COMPLETION_RESERVE):
+    """
+    Returns the number of prompt tokens available for the model.
+    """
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW) - completion_tokens
+
+
+def fit_prompt(model, fixed_tokens, article, chunks, completion_tokens=PROMPT_COMPLETION_RESERVE):
+    """
+    Trims the article and RAG chunks so the whole prompt fits the model's context window.
+    fixed_tokens is the cost of the instructions and messages without the article and
+    chunks. chunks are ordered most relevant first; the least relevant are dropped
+    first, and the article is truncated only when no chunks are left.
+    Returns (article, chunks).
+    """
+    budget = prompt_budget(model, completion_tokens) - fixed_tokens
+    article_tokens = count_tokens(article, model)
+    chunk_tokens = [count_tokens(chunk, model) for chunk in chunks]
+
+    kept = list(chunks)
+    while kept and article_tokens + sum(chunk_tokens[:len(kept)]) > budget:
+        kept.pop()
+
+    if len(kept) < len(chunks):
+        logger.info(f"Prompt budget for {model}: dropped {len(chunks) - len(kept)} of {len(chunks)} context chunks")
+
+    if article_tokens + sum(chunk_tokens[:len(kept)]) > budget:
+        logger.info(f"Prompt budget for {model}: truncating article from {article_tokens} to {budget} tokens")
+        article = truncate_to_tokens(article, budget, model)
+
+    return article, kept
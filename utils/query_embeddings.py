@@ -0,0 +1,89 @@
+# utils/query_embeddings.py
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from utils.embedding_service import EmbeddingBatcher, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+
+
+def query_key(text):
+    """Returns the cache key of a query text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class QueryEncoder:
+    """
+    Query embeddings for retrieval. Repeated texts are served from an LRU keyed by
+    the text hash; misses from concurrent requests go through an EmbeddingBatcher so
+    they are encoded together in one forward pass, and identical texts in flight are
+    encoded once. Returned vectors are read-only and shared between callers.
+    """
+
+    def __init__(self, encode, max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+                 max_batch=EMBEDDING_BATCH_MAX_SIZE, max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS):
+        self.max_entries = max_entries
+        self._batcher = EmbeddingBatcher(encode, max_batch, max_wait_ms)
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def submit(self, text):
+        """Returns a Future of the embedding vector of the text."""
+        key = query_key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                future = Future()
+                future.set_result(vector)
+                return future
+            future = self._pending.get(key)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                return future
+            self._counters['misses'] += 1
+            future = self._pending[key] = Future()
+
+        self._batcher.submit([text]).add_done_callback(lambda done: self._resolve(key, future, done))
+        return future
+
+    def _resolve(self, key, future, done):
+        error = done.exception()
+        if error is not None:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(error)
+            return
+
+        vector = done.result()[0].copy()
+        vector.flags.writeable = False
+        with self._lock:
+            self._pending.pop(key, None)
+            self._entries[key] = vector
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(vector)
+
+    def encode(self, texts):
+        """Returns the embeddings of the texts as a (len(texts), dim) float32 array."""
+        futures = [self.submit(text) for text in texts]
+        return np.stack([future.result() for future in futures])
+
+    def stats(self):
+        """Returns hit/miss counters and the cache size."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+        return stats
@@ -0,0 +1,187 @@
+# utils/vector_index.py
+
+import os
+import logging
+from array import array
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Corpora up to this size use exact search; larger ones use the IVF index
+VECTOR_INDEX_EXACT_THRESHOLD = int(os.getenv("VECTOR_INDEX_EXACT_THRESHOLD", 50000))
+# Number of inverted lists scanned per query (higher = better recall, slower)
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", 8))
+
+_ASSIGN_BATCH_SIZE = 65536
+
+
+def _normalize(vectors):
+    """
+    Returns the vectors as L2-normalized float32 rows.
+    Input that is already normalized float32 is returned without a copy.
+    """
+    vectors = np.asarray(vectors)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    if vectors.dtype != np.float32:
+        vectors = vectors.astype(np.float32)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    if vectors.size == 0 or np.allclose(norms, 1.0, atol=1e-3):
+        return vectors
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, top_k):
+    """
+    Returns the positions of the top_k highest scores, best first (none for top_k <= 0).
+    """
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if top_k >= len(scores):
+        return np.argsort(scores)[::-1]
+    top = np.argpartition(scores, -top_k)[-top_k:]
+    return top[np.argsort(scores[top])[::-1]]
+
+
+class _VectorBuffer:
+    """
+    Growable float32 matrix with amortized O(1) appends.
+    Wraps the initial vectors without copying until the first append.
+    """
+
+    def __init__(self, vectors):
+        self._data = vectors
+        self._size = len(vectors)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        return self._data[:self._size]
+
+    def append(self, vectors):
+        needed = self._size + len(vectors)
+        if needed > len(self._data) or not self._data.flags.writeable:
+            capacity = max(needed, 2 * len(self._data), 1024)
+            grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = vectors
+        start, self._size = self._size, needed
+        return np.arange(start, needed)
+
+
+class ExactIndex:
+    """
+    Brute-force inner-product search over normalized float32 vectors.
+    """
+
+    def __init__(self, vectors):
+        self._buffer = _VectorBuffer(_normalize(vectors))
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def add(self, vectors):
+        """Adds vectors and returns their ids."""
+        return self._buffer.append(_normalize(vectors))
+
+    def search(self, query, top_k=3):
+        """Returns (ids, scores) of the top_k most similar vectors, best first."""
+        if len(self._buffer) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self._buffer.vectors @ _normalize(query)[0]
+        top = _top_k(scores, top_k)
+        return top, scores[top]
+
+
+class IVFIndex:
+    """
+    Inverted-file index: vectors are grouped by their nearest k-means centroid and
+    a query only scans the n_probe closest groups.
+    """
+
+    def __init__(self, vectors, n_lists=None, n_probe=VECTOR_INDEX_NPROBE, n_iter=10, seed=0):
+        vectors = _normalize(vectors)
+        self.n_probe = n_probe
+        self._buffer = _VectorBuffer(vectors)
+
+        n_lists = n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+        self._centroids = self._train(vectors, min(n_lists, len(vectors)), n_iter, seed)
+        self._lists = [array('q') for _ in range(len(self._centroids))]
+        self._assign_to_lists(vectors, 0)
+
+    def __len__(self):
+        return len(self._buffer)
+
+    @staticmethod
+    def _train(vectors, n_lists, n_iter, seed):
+        """Spherical k-means on a sample of the vectors."""
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(vectors), 40 * n_lists)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            labels = IVFIndex._nearest(sample, centroids)
+            order = np.argsort(labels, kind='stable')
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = centroids.copy()
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            centroids = _normalize(sums)
+
+        return centroids
+
+    @staticmethod
+    def _nearest(vectors, centroids):
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _ASSIGN_BATCH_SIZE):
+            batch = vectors[start:start + _ASSIGN_BATCH_SIZE]
+            labels[start:start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+        return labels
+
+    def _assign_to_lists(self, vectors, first_id):
+        labels = self._nearest(vectors, self._centroids)
+        for offset, label in enumerate(labels):
+            self._lists[label].append(first_id + offset)
+
+    def add(self, vectors):
+        """Adds vectors to their nearest lists without retraining and returns their ids."""
+        vectors = _normalize(vectors)
+        ids = self._buffer.append(vectors)
+        if len(ids):
+            self._assign_to_lists(vectors, ids[0])
+        return ids
+
+    def search(self, query, top_k=3, n_probe=None):
+        """Returns (ids, scores) of the approximate top_k most similar vectors, best first."""
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = _normalize(query)[0]
+        n_probe = min(n_probe or self.n_probe, len(self._centroids))
+
+        probe = _top_k(self._centroids @ query, n_probe)
+        candidates = np.concatenate([np.array(self._lists[i], dtype=np.int64) for i in probe])
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self._buffer.vectors[candidates] @ query
+        top = _top_k(scores, top_k)
+        return candidates[top], scores[top]
+
+
+def build_index(vectors, exact_threshold=VECTOR_INDEX_EXACT_THRESHOLD, **kwargs):
+    """
+    Builds an exact index for small corpora and an IVF index for large ones.
+    Extra keyword arguments are passed to IVFIndex.
+    """
+    if len(vectors) <= exact_threshold:
+        return ExactIndex(vectors)
+
+    logger.info(f"Building IVF index over {len(vectors)} vectors")
+    return IVFIndex(vectors, **kwargs)